@@ -0,0 +1,122 @@
+# opt-in DM digests - with DM_DIGEST_WINDOW set in .env (seconds, 0 = off), scheduled DMs aren't sent right away:
+# they're buffered per member, and once the window after a member's 1st buffered DM closes, everything they got in the
+# meantime (several set_timely_dm jobs for different roles, the weekly bad-standing report, ...) is merged & sent as
+# 1 message - split into several only where it won't fit in Discord's 2000-character limit
+
+import asyncio
+import os
+
+import discord
+
+DM_DIGEST_WINDOW: float = float(os.getenv('DM_DIGEST_WINDOW', '0'))
+MESSAGE_LIMIT: int = 2000  # Discord's max message length
+MAX_FILES: int = 10  # Discord's max attachments per message
+SEPARATOR = "\n\n"
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    # cut at the last line break (or space) that fits, only cutting mid-word if there isn't one
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            pieces.append(text[:limit])
+            text = text[limit:]
+        else:
+            pieces.append(text[:cut])
+            text = text[cut + 1:]
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def merge_messages(messages: list[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """
+    packs messages into as few chunks of at most limit characters as possible, keeping their order & never splitting
+    a message that fits in 1 chunk on its own
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    length = 0
+    for message in messages:
+        for piece in split_message(message, limit):
+            if current and length + len(SEPARATOR) + len(piece) > limit:
+                chunks.append(SEPARATOR.join(current))
+                current, length = [], 0
+            length += len(piece) + (len(SEPARATOR) if current else 0)
+            current.append(piece)
+    if current:
+        chunks.append(SEPARATOR.join(current))
+    return chunks
+
+
+class DMDigest:
+    def __init__(self, window: float = DM_DIGEST_WINDOW, limit: int = MESSAGE_LIMIT):
+        self.window = window
+        self.limit = limit
+        # member id -> (member, buffered messages, buffered file paths)
+        self._pending: dict[int, tuple[discord.abc.User, list[str], list[str]]] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self.buffered = 0  # DMs that went through the digest
+        self.sent = 0  # messages actually sent for them
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def add(self, member: discord.abc.User, content: str, file_path: str = None) -> None:
+        # has to be called from inside the event loop - the 1st DM for a member starts their window
+        if member.id not in self._pending:
+            self._pending[member.id] = (member, [], [])
+            self._timers[member.id] = asyncio.create_task(self._flush_later(member.id))
+        _, messages, file_paths = self._pending[member.id]
+        if content:
+            messages.append(content)
+        if file_path:
+            file_paths.append(file_path.strip('"'))  # remove quotation marks - file paths don't have ""
+        self.buffered += 1
+
+    async def _flush_later(self, member_id: int) -> None:
+        await asyncio.sleep(self.window)
+        self._timers.pop(member_id, None)
+        await self.flush(member_id)
+
+    async def flush(self, member_id: int) -> None:
+        pending = self._pending.pop(member_id, None)
+        if pending is None:
+            return
+        member, messages, file_paths = pending
+        chunks: list[str | None] = merge_messages(messages, self.limit) or [None]
+        # attachments go on the last chunk, 10 at a time - any extra files get messages of their own
+        file_groups = [file_paths[i:i + MAX_FILES] for i in range(0, len(file_paths), MAX_FILES)] or [[]]
+        chunks += [None] * (len(file_groups) - 1)
+        file_groups = [[]] * (len(chunks) - len(file_groups)) + file_groups
+
+        for chunk, group in zip(chunks, file_groups):
+            try:
+                if group:
+                    await member.send(chunk, files=[discord.File(path) for path in group])
+                else:
+                    await member.send(chunk)
+                self.sent += 1
+            except discord.Forbidden:
+                print(f"Could not send DM to {member.name} (DMs might be disabled).")
+                return
+            except Exception as e:
+                print(f"Failed to send DM to {member.name}: {e}")
+        print(f"[digest] sent {len(messages)} DM(s) to {member.name} as {len(chunks)} message(s)")
+
+    def report(self) -> str:
+        # shown by the loop_lag command - buffered vs sent is how many Discord API calls the digest saved
+        return (f"DM digest ({self.window:g}s window): {self.buffered} DM(s) buffered, {self.sent} message(s) sent, "
+                f"{len(self._pending)} member(s) waiting")
+
+    async def flush_all(self) -> None:
+        # e.g. on shutdown - sends everything still buffered without waiting for the windows to close
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for member_id in list(self._pending):
+            await self.flush(member_id)
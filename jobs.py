@@ -0,0 +1,99 @@
+# scheduled-job plumbing shared by the bot (main.py) and the separate scheduler worker (scheduler_worker.py)
+#
+# a job is described with plain ids/strings instead of discord objects so it can be handed to another process:
+#   kind: "message" (print_message), "dm" (print_dm) or "bad_status" (print_bad_status)
+#   trigger: {"type": "cron", "day": ..., "hour": ..., "minute": ..., "second": ...}
+#            or {"type": "date", "run_date": "<ISO datetime with UTC offset>"}
+#   job_args: ids & strings the job needs, e.g. {"channel_id": ..., "message": ..., "file_path": ...}
+#
+# in "sharded" deployment mode the bot only writes jobs into a SQLite queue and the worker process reads them back out,
+# so weekly DM fan-outs never run on the gateway process' event loop
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pytz
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+
+TIMEZONE = pytz.timezone('America/Los_Angeles')
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', '/mnt/mydatavolume/sqlite_data/job_queue.db')
+
+
+def cron_spec(day: str, hour: str, minute: str, second: str) -> dict:
+    # "none" means "every" for that field, same as the slash command inputs
+    return {'type': 'cron',
+            'day': None if day.lower() == "none" else day,
+            'hour': None if hour.lower() == "none" else hour,
+            'minute': None if minute.lower() == "none" else minute,
+            'second': None if second.lower() == "none" else second}
+
+
+def date_spec(send_time: datetime) -> dict:
+    return {'type': 'date', 'run_date': send_time.isoformat()}
+
+
+def build_trigger(trigger: dict):
+    if trigger['type'] == 'date':
+        return DateTrigger(run_date=datetime.fromisoformat(trigger['run_date']))
+    return CronTrigger(day=trigger['day'], hour=trigger['hour'], minute=trigger['minute'], second=trigger['second'],
+                       timezone=TIMEZONE)
+
+
+def is_expired(trigger: dict) -> bool:
+    # one-time jobs whose time already passed (e.g. queued while the worker was down) shouldn't be scheduled again
+    return trigger['type'] == 'date' and datetime.fromisoformat(trigger['run_date']) < datetime.now(pytz.UTC)
+
+
+def connect_queue(path: str = JOB_QUEUE_DB) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE IF NOT EXISTS job_queue ('
+                       '    id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                       '    action TEXT NOT NULL,'  # "add" or "remove_all"
+                       '    kind TEXT,'
+                       '    trigger TEXT,'
+                       '    job_args TEXT,'
+                       '    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)')
+    return connection
+
+
+def enqueue_job(kind: str, trigger: dict, job_args: dict, path: str = JOB_QUEUE_DB) -> None:
+    connection = connect_queue(path)
+    with connection:
+        connection.execute('INSERT INTO job_queue (action, kind, trigger, job_args) VALUES (?, ?, ?, ?)',
+                           ('add', kind, json.dumps(trigger), json.dumps(job_args)))
+    connection.close()
+
+
+def enqueue_remove_all(path: str = JOB_QUEUE_DB) -> None:
+    connection = connect_queue(path)
+    with connection:
+        connection.execute("INSERT INTO job_queue (action) VALUES ('remove_all')")
+    connection.close()
+
+
+def read_queue(after_id: int, path: str = JOB_QUEUE_DB) -> list[tuple[int, str, str | None, dict | None, dict | None]]:
+    """
+    returns every queue entry newer than after_id as (id, action, kind, trigger, job_args), oldest first
+    """
+    connection = connect_queue(path)
+    try:
+        rows = connection.execute('SELECT id, action, kind, trigger, job_args FROM job_queue WHERE id > ? '
+                                  'ORDER BY id', (after_id,)).fetchall()
+    finally:
+        connection.close()  # the worker keeps polling after a failed read - don't leak a connection each time
+    return [(row_id, action, kind, json.loads(trigger) if trigger else None, json.loads(job_args) if job_args else None)
+            for row_id, action, kind, trigger, job_args in rows]
+
+
+def last_reset_id(path: str = JOB_QUEUE_DB) -> int:
+    """
+    id of the newest "remove_all" entry (0 if there isn't one) - everything after it is the current set of jobs,
+    which is what a (re)starting worker replays
+    """
+    connection = connect_queue(path)
+    row = connection.execute("SELECT MAX(id) FROM job_queue WHERE action = 'remove_all'").fetchone()
+    connection.close()
+    return row[0] or 0
@@ -0,0 +1,196 @@
+# load-test driver - fires bursts of synthetic slash-command interactions at the bot's real command handlers, with
+# Google Sheets/Calendar answered by a local stub (or a recording, see recorder.py), and reports how quickly the bot
+# acknowledges them, how many would've timed out on Discord's side, how far the event loop fell behind & what
+# blocked it (see loop_watchdog.py)
+#
+# usage: python loadtest.py --command bad_standing_check --command events_check --burst 50 --bursts 5 --interval 2
+#        python loadtest.py --recording RECORDING.jsonl --command note --burst 10
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import httplib2
+
+from loop_watchdog import LoopWatchdog
+from replay import ACK_DEADLINE, OfflineChannel, OfflineGuild, OfflineInteraction, OfflineUser, ReplayHttp, \
+    load_recording, offline_bot
+
+# the stub spreadsheet's layout - used as the default chapter's config
+STUB_CONFIG = {'SPREADSHEET_ID': 'loadtest-spreadsheet', 'CALENDAR_ID': 'loadtest-calendar',
+               'X_CHECK_RANGE': 'attendance!A1:ZZ', 'NAME_RANGE': 'roster!A2:A', 'SCORES_RANGE': 'roster!B2:B',
+               'OTHER_HOURS_RANGE': 'roster!C2:G', 'NOTE_SHEET_TITLE': 'roster'}
+LOADTEST_GUILD_ID: int = 1
+
+
+def column_number(letters: str) -> int:
+    # "A" -> 1, "Z" -> 26, "AA" -> 27
+    number = 0
+    for letter in letters.upper():
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+class StubGoogleHttp:
+    """
+    answers Sheets & Calendar API requests from a made-up chapter (members, events, random "x"/"t" marks) after
+    sleeping latency seconds - plugged in where httplib2.Http would normally go
+    """
+
+    def __init__(self, members: int = 60, events: int = 30, latency: float = 0.1, seed: int = 0):
+        self.latency = latency
+        self.names = [f"Brother {i + 1}" for i in range(members)]
+        rng = random.Random(seed)
+        attendance = [[f"Event {j + 1}" for j in range(events)]]
+        attendance += [[rng.choice(['', '', '', 'x', 't']) for _ in range(events)] for _ in range(members)]
+        roster = [['name', 'points', 'tutoring', 'committee', 'study', 'missed tabling', 'extra tabling']]
+        roster += [[name, str(rng.choice([0, 0.5, 1, 2, 3])), *(str(rng.randint(0, 2)) for _ in range(5))]
+                   for name in self.names]
+        self.tabs = {'attendance': attendance, 'roster': roster}
+        self.calendar_items = [{'summary': f"Event {j + 1}",
+                                'start': {'dateTime': f"2030-01-{j % 28 + 1:02d}T18:00:00-08:00"},
+                                'end': {'dateTime': f"2030-01-{j % 28 + 1:02d}T20:00:00-08:00"}}
+                               for j in range(min(events, 29))]
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def read_range(self, a1_range: str) -> dict:
+        title, cells = a1_range.rsplit('!', 1)
+        match = re.match(r"^([A-Za-z]*)(\d*)(?::([A-Za-z]*)(\d*))?$", cells)
+        start_col, start_row, end_col, end_row = match.groups()
+        grid = self.tabs.get(title.strip("'"), [])
+        first_row = int(start_row) if start_row else 1
+        last_row = int(end_row) if end_row else len(grid)
+        first_col = column_number(start_col) if start_col else 1
+        # row-only ranges like "2:201" (a whole tab) cover every column
+        last_col = column_number(end_col) if end_col else (first_col if start_col else max(map(len, grid), default=1))
+        values = [row[first_col - 1:last_col] for row in grid[first_row - 1:last_row]]
+        # Google trims trailing empty cells & rows
+        values = [row[:max((i + 1 for i, cell in enumerate(row) if cell != ''), default=0)] for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return {'range': a1_range, 'values': values} if values else {'range': a1_range}
+
+    def answer(self, uri: str, method: str, body) -> dict:
+        parts = urlsplit(uri)
+        path, query = unquote(parts.path), parse_qs(parts.query)
+        if '/calendar/' in path:
+            if method == 'POST':  # events().insert - echo the event back
+                return json.loads(body)
+            return {'items': self.calendar_items}
+        if path.endswith(':batchUpdate'):
+            return {'replies': []}
+        if path.endswith(':batchGet'):
+            return {'valueRanges': [self.read_range(a1_range) for a1_range in query.get('ranges', [])]}
+        if '/values/' in path:
+            return self.read_range(path.split('/values/', 1)[1])
+        # spreadsheets().get - tab metadata
+        return {'sheets': [{'properties': {'sheetId': index, 'title': title, 'index': index}}
+                           for index, title in enumerate(self.tabs)]}
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)  # runs in a worker thread, like the real request
+        content = json.dumps(self.answer(uri, method, body)).encode('utf-8')
+        return httplib2.Response({'status': '200', 'content-type': 'application/json; charset=UTF-8'}), content
+
+
+async def fire(main, command_name: str, options: dict, user_name: str) -> OfflineInteraction:
+    guild = OfflineGuild(LOADTEST_GUILD_ID, [OfflineChannel(2, 'general')])
+    interaction = OfflineInteraction(OfflineUser(random.getrandbits(48), user_name.lower(), user_name), guild, 2,
+                                     {'name': command_name})
+    interaction.started_at = time.perf_counter()
+    try:
+        await main.bot.tree.get_command(command_name).callback(interaction, **options)
+    except Exception as e:
+        interaction.error = e
+    interaction.finished_at = time.perf_counter()
+    return interaction
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+async def run_load_test(main, commands: list[str], options: dict, user_names: list[str], burst: int, bursts: int,
+                        interval: float) -> tuple[list[tuple[str, OfflineInteraction]], LoopWatchdog, float]:
+    # same watchdog the bot runs, with a shorter heartbeat so short bursts still get enough lag samples
+    watchdog = LoopWatchdog(interval=0.05)
+    watchdog.start()
+
+    started = time.perf_counter()
+    tasks: list[tuple[str, asyncio.Task]] = []
+    for burst_number in range(bursts):
+        if burst_number:
+            await asyncio.sleep(interval)
+        for i in range(burst):
+            command_name = commands[i % len(commands)]
+            tasks.append((command_name, asyncio.create_task(
+                fire(main, command_name, options.get(command_name, {}), random.choice(user_names)))))
+    results = [(command_name, await task) for command_name, task in tasks]
+    elapsed = time.perf_counter() - started
+
+    watchdog.stop()
+    return results, watchdog, elapsed
+
+
+def print_report(results: list[tuple[str, OfflineInteraction]], watchdog: LoopWatchdog, elapsed: float) -> None:
+    print(f"{len(results)} interactions in {elapsed:.2f}s")
+    print(f"{'command':<24}{'runs':>6}{'p50 ack':>10}{'p95 ack':>10}{'p99 ack':>10}{'timeouts':>10}{'errors':>8}")
+    for command_name in sorted({name for name, _ in results}):
+        runs = [interaction for name, interaction in results if name == command_name]
+        acks = [interaction.ack_latency() for interaction in runs if interaction.ack_latency() is not None]
+        timeouts = sum(1 for interaction in runs
+                       if interaction.ack_latency() is None or interaction.ack_latency() > ACK_DEADLINE)
+        errors = sum(1 for interaction in runs if interaction.error is not None)
+        print(f"{command_name:<24}{len(runs):>6}{percentile(acks, 50):>10.3f}{percentile(acks, 95):>10.3f}"
+              f"{percentile(acks, 99):>10.3f}{f'{timeouts / len(runs):.0%}':>10}{errors:>8}")
+
+    print(watchdog.report())
+
+    first_error = next((interaction.error for _, interaction in results if interaction.error), None)
+    if first_error is not None:
+        print(f"first error: {type(first_error).__name__}: {first_error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="fire bursts of synthetic slash commands at the bot, offline")
+    parser.add_argument('--command', action='append', dest='commands',
+                        help="command to fire (repeat for a mix) - default: bad_standing_check")
+    parser.add_argument('--option', action='append', default=[], metavar='COMMAND.NAME=VALUE',
+                        help="option to pass to a command, e.g. add_event.title=test")
+    parser.add_argument('--burst', type=int, default=20, help="interactions fired at once")
+    parser.add_argument('--bursts', type=int, default=3, help="number of bursts")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between bursts")
+    parser.add_argument('--members', type=int, default=60, help="members in the stub spreadsheet")
+    parser.add_argument('--events', type=int, default=30, help="events in the stub spreadsheet")
+    parser.add_argument('--google-latency', type=float, default=0.1, help="seconds the stub takes per request")
+    parser.add_argument('--recording', help="answer Google requests from a recording instead of the stub")
+    args = parser.parse_args()
+
+    command_options: dict[str, dict] = {}
+    for option in args.option:
+        key, value = option.split('=', 1)
+        command, name = key.split('.', 1)
+        command_options.setdefault(command, {})[name] = value
+
+    if args.recording:
+        session, _, http_entries = load_recording(args.recording)
+        bot_module = offline_bot(ReplayHttp(http_entries), session.get('config'))
+        names = ["load tester"]
+    else:
+        stub = StubGoogleHttp(args.members, args.events, args.google_latency)
+        bot_module = offline_bot(stub, STUB_CONFIG)
+        names = stub.names
+
+    print_report(*asyncio.run(run_load_test(bot_module, args.commands or ['bad_standing_check'], command_options,
+                                            names, args.burst, args.bursts, args.interval)))
@@ -0,0 +1,106 @@
+# event-loop watchdog - keeps measuring how far behind the event loop is running & catches whatever blocks it
+#
+# a heartbeat task sleeps for a short interval over & over - when it wakes up late, that delay is the loop's lag.
+# A separate thread watches the heartbeat: if it stops for longer than the threshold, the loop is stuck in some
+# blocking call (a synchronous Google/SQLite call, a long loop, ...) and the watchdog grabs the loop thread's stack
+# right then, while it's still blocked, so the report shows exactly which call it was
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+LOOP_LAG_THRESHOLD: float = float(os.getenv('LOOP_LAG_THRESHOLD', '0.5'))  # seconds the loop may be blocked for
+
+
+class LoopWatchdog:
+    def __init__(self, interval: float = 0.1, threshold: float = LOOP_LAG_THRESHOLD, history: int = 3000,
+                 max_stalls: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: deque[float] = deque(maxlen=history)  # most recent heartbeat delays (seconds)
+        self.stalls: deque[dict] = deque(maxlen=max_stalls)  # most recent blocking episodes, oldest first
+        self.stall_count = 0
+        self.loop = None
+        self._loop_thread_id = None
+        self._last_beat = 0.0
+        self._task = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        # has to be called from inside the event loop that should be watched
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = self.loop.create_task(self._beat(), name='loop-watchdog-heartbeat')
+        threading.Thread(target=self._watch, name='loop-watchdog', daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.lags.append(max(0.0, now - expected))
+            self._last_beat = now
+
+    def _watch(self) -> None:
+        stall = None
+        while not self._stopped.wait(self.interval / 2):
+            blocked_for = time.perf_counter() - self._last_beat - self.interval
+            if blocked_for > self.threshold:
+                if stall is None:
+                    stall = self._capture(blocked_for)
+                    self.stalls.append(stall)
+                    self.stall_count += 1
+                    print(f"[watchdog] event loop blocked for {blocked_for:.2f}s+ in {stall['task']}:\n"
+                          f"{''.join(stall['stack'])}")
+                else:
+                    stall['duration'] = blocked_for
+            elif stall is not None:
+                print(f"[watchdog] event loop unblocked after {stall['duration']:.2f}s ({stall['task']})")
+                stall = None
+
+    def _capture(self, blocked_for: float) -> dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else ['(no stack available)\n']  # 1 str per frame
+        task = asyncio.current_task(self.loop)  # whichever coroutine is holding the loop
+        if task is None:
+            task_name = 'event loop (no task)'
+        else:
+            coro = task.get_coro()
+            task_name = f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+        return {'started': time.time() - blocked_for, 'duration': blocked_for, 'task': task_name, 'stack': stack}
+
+    def lag_stats(self) -> dict:
+        lags = sorted(self.lags)
+        if not lags:
+            return {'p50': 0.0, 'p99': 0.0, 'max': 0.0, 'samples': 0}
+        return {'p50': lags[len(lags) // 2], 'p99': lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+                'max': lags[-1], 'samples': len(lags)}
+
+    def report(self, stalls: int = 3, stack_lines: int = 6) -> str:
+        """
+        short human-readable summary - current lag stats plus the tail of the last few stalls' stacks
+        """
+        stats = self.lag_stats()
+        lines = [f"event-loop lag over the last {stats['samples']} heartbeats: p50 {stats['p50'] * 1000:.1f}ms, "
+                 f"p99 {stats['p99'] * 1000:.1f}ms, max {stats['max'] * 1000:.1f}ms",
+                 f"{self.stall_count} stall(s) over {self.threshold}s since startup"]
+        for stall in list(self.stalls)[-stalls:]:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stall['started']))
+            stack = ''.join(stall['stack'][-stack_lines:])  # innermost frames = the blocking call
+            lines.append(f"- {when}: blocked {stall['duration']:.2f}s in {stall['task']}\n{stack}")
+        return "\n".join(lines)
@@ -8,6 +8,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 import asyncio
+import dataclasses
 import functools
 
 import discord
@@ -17,6 +18,15 @@ from discord import Intents, Client, Message
 from discord import app_commands
 from discord.ext import commands, tasks
 from responses import get_response
+from sheets import note_column_request, write_batch_update, format_row_ranges, read_event_titles, \
+    iter_attendance_blocks, split_a1_range, RangeError
+from standing import attendance_reason, load_standings
+from jobs import cron_spec, date_spec, build_trigger, enqueue_job, enqueue_remove_all
+from tenants import TenantConfig, TenantRegistry, ThreadLocalResource, MAX_CONCURRENT_CALLS
+from recorder import Recorder, RecordingHttp
+from loop_watchdog import LoopWatchdog
+from templates import MessageTemplate, compile_template, DM_FIELDS, STANDING_FIELDS
+from digest import DMDigest
 
 from datetime import datetime, timedelta, time, timezone
 import pytz
@@ -26,6 +36,8 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 from googleapiclient.errors import HttpError  # for specific error handling in the future
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 
 import sqlite3
 
@@ -37,8 +49,8 @@ print(TOKEN)
 
 SERVICE_ACCOUNT_FILE = "C:\ThetaTau\TTscribblerbot\serviceaccount_auto_auth.json"  # uncomment this line when running on local machine
 
-# load ID of my Google spreadsheet of choice and ranges of cells I want to access/edit from .env
-SPREADSHEET_ID = os.getenv('SPREADSHEET_ID')
+# load ranges of cells I want to access/edit for the test command from .env
+# (SPREADSHEET_ID & the other ranges are the default chapter's config now - see tenants.py)
 RANGE1 = os.getenv('TEST_READ_RANGE')
 RANGE2 = os.getenv('TEST_WRITE_RANGE')
 
@@ -47,14 +59,36 @@ intents: Intents = Intents.default()
 intents.message_content = True  # enables access to message content for bot
 intents.members = True  # enables access to guild member's info for bot
 
+# deployment mode - "single" (default): 1 process does everything
+# "sharded": gateway runs as an AutoShardedBot & scheduled jobs are handed (through a SQLite queue) to a separate
+# scheduler worker process - start it with "python scheduler_worker.py"
+DEPLOY_MODE = os.getenv('DEPLOY_MODE', 'single').lower()
+
 # create a "bot command" instance - I'm assuming this is used for SPECIFIC commands like "/test" that
 # user types in message
-bot = commands.Bot(command_prefix='/', intents=intents)
+bot_class = commands.AutoShardedBot if DEPLOY_MODE == 'sharded' else commands.Bot
+
+
+class ScribblerBot(bot_class):
+    async def close(self) -> None:
+        # send DMs still waiting in a digest window (see digest.py) before the connection goes away
+        await dm_digest.flush_all()
+        await super().close()
+
+
+bot = ScribblerBot(command_prefix='/', intents=intents)
 
 # initialize a scheduler instance - for scheduling timely messages
 scheduler = AsyncIOScheduler()
 # scheduler = BackgroundScheduler()
 
+# keeps measuring event-loop lag & prints the stack of anything that blocks the loop for over LOOP_LAG_THRESHOLD
+# seconds (see loop_watchdog.py) - admins can check on it with the loop_lag command
+watchdog = LoopWatchdog()
+
+# buffers scheduled DMs per member & merges them into 1 message when DM_DIGEST_WINDOW is set (see digest.py)
+dm_digest = DMDigest()
+
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets',
           'https://www.googleapis.com/auth/calendar']
@@ -66,17 +100,56 @@ web browsers manually
 # creds = credentials = service_account.Credentials.from_service_account_file(
 #    os.getenv('GOOGLE_APPLICATION_CREDENTIALS'), scopes=SCOPES)
 
-creds = service_account.Credentials.from_service_account_file(
+# GOOGLE_OFFLINE=1 is for offline runs (replay.py) - there's no service account, every Google call gets answered by
+# whatever the runner puts in offline_http instead
+GOOGLE_OFFLINE = os.getenv('GOOGLE_OFFLINE') == '1'
+offline_http = None
+
+creds = None if GOOGLE_OFFLINE else service_account.Credentials.from_service_account_file(
     SERVICE_ACCOUNT_FILE, scopes=SCOPES)
 
+# capture mode - set RECORD_DIR to record interactions & Google API traffic for replay.py (see recorder.py)
+RECORD_DIR = os.getenv('RECORD_DIR')
+recorder = None if not RECORD_DIR else Recorder(RECORD_DIR, {
+    'SPREADSHEET_ID': os.getenv('SPREADSHEET_ID'), 'X_CHECK_RANGE': os.getenv('X_CHECK_RANGE'),
+    'NAME_RANGE': os.getenv('NAME_RANGE'), 'SCORES_RANGE': os.getenv('SCORES_RANGE'),
+    'OTHER_HOURS_RANGE': os.getenv('OTHER_HOURS_RANGE'), 'NOTE_SHEET_TITLE': os.getenv('NOTE_SHEET_TITLE'),
+    'CALENDAR_ID': os.getenv('CALENDAR_ID')})
+
+
+# helper function for the http object each thread's Google services send requests through
+def google_http():
+    if GOOGLE_OFFLINE:
+        return offline_http
+    return AuthorizedHttp(creds, http=RecordingHttp(recorder) if recorder else httplib2.Http())
+
 # instance for Google Calendar - called "service_calendars"
 # this service instance is from a class with multiple subclasses (my way of describing it)
 # including an Events subclass - call service_calendars.events() to access
 # we don't need to create any sub-instances like we do with Google sheets
-service_calendars = build('calendar', 'v3', credentials=creds)
-service_sheets = build('sheets', 'v4', credentials=creds)
+# (both are built once per thread - Google API calls run in worker threads so they don't block the bot)
+service_calendars = ThreadLocalResource(lambda: build('calendar', 'v3', http=google_http(), cache_discovery=False))
 # instance for Google sheets - called "sheet"
-sheet = service_sheets.spreadsheets()
+sheet = ThreadLocalResource(lambda: build('sheets', 'v4', http=google_http(), cache_discovery=False).spreadsheets())
+
+# every chapter's spreadsheet/ranges/calendar, looked up by guild id - each chapter gets its own spreadsheet metadata
+# cache (tab titles -> sheetId's) and its own budget of concurrent Google API calls
+tenants = TenantRegistry(sheet, service_calendars, TenantConfig.from_env())
+
+
+# helper function to load every Brother's standing record (event titles are only stored once, in the shared table)
+# runs in a worker thread, counted against the chapter's API budget
+async def fetch_standings(tenant):
+    config = tenant.config
+    return await tenant.run(load_standings, tenant.sheet, config.spreadsheet_id, config.x_check_range,
+                            config.name_range, config.scores_range, config.other_hours_range)
+
+
+# helper function to reply to a deferred interaction with an ephemeral message that deletes itself
+# (commands that call Google defer 1st - waiting on the chapter's API budget mustn't run out Discord's 3 seconds)
+async def send_followup(interaction: discord.Interaction, content: str, delete_after: float = 60):
+    message = await interaction.followup.send(content, ephemeral=True, wait=True)
+    await message.delete(delay=delete_after)
 
 
 # STEP 2: MESSAGING FUNCTIONALITY
@@ -102,11 +175,27 @@ async def on_ready() -> None:
     try:
         synced = await bot.tree.sync()
         print(f"synced {len(synced)} command(s)")
-        scheduler.start()
+        # in sharded mode scheduled jobs run in the scheduler worker instead
+        # (on_ready can fire again after reconnecting - don't start the scheduler twice)
+        if DEPLOY_MODE != 'sharded' and not scheduler.running:
+            scheduler.start()
+        if not watchdog.running:
+            watchdog.start()
     except Exception as e:
         print(e)
 
 
+# STEP 3*: RECORD INCOMING SLASH COMMANDS IN CAPTURE MODE (see recorder.py)
+async def record_interaction(interaction: discord.Interaction) -> None:
+    if interaction.type == discord.InteractionType.application_command:
+        config = tenants.get(interaction.guild_id).config
+        recorder.record_interaction(interaction, dataclasses.asdict(config))
+
+
+if recorder:
+    bot.add_listener(record_interaction, 'on_interaction')
+
+
 # STEP 4: HANDLE INCOMING MESSAGE
 # @bot.event
 # async def on_message(message: Message) -> None:
@@ -134,13 +223,19 @@ async def testCommand(interaction: discord.Interaction):
     body = {
         'values': valuesToWrite
     }
-    result = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=RANGE1).execute()
-    result2 = sheet.values().update(spreadsheetId=SPREADSHEET_ID, range=RANGE2, valueInputOption='USER_ENTERED',
-                                    body=body).execute()
+    tenant = tenants.get(interaction.guild_id)
+    spreadsheet_id = tenant.config.spreadsheet_id
+    # acknowledge 1st - the Google calls below may have to wait for a free slot in this chapter's budget
+    await interaction.response.defer(thinking=True)
+    result = await tenant.run(lambda: tenant.sheet.values().get(spreadsheetId=spreadsheet_id, range=RANGE1).execute())
+    result2 = await tenant.run(lambda: tenant.sheet.values().update(spreadsheetId=spreadsheet_id, range=RANGE2,
+                                                                    valueInputOption='USER_ENTERED',
+                                                                    body=body).execute())
     values = result.get('values', [])
 
     if not values:
         print('No data found.')
+        await interaction.followup.send('No data found.')
     else:
         print('Name, Major:')
         response_message = []
@@ -148,7 +243,7 @@ async def testCommand(interaction: discord.Interaction):
             # Print columns A and E, which correspond to indices 0 and 4.
             print('%s, %s' % (row[0], row[1]))
             response_message.append(f'{row[0]}, {row[1]}')
-        await interaction.response.send_message("\n".join(i for i in response_message))
+        await interaction.followup.send("\n".join(i for i in response_message))
 
 
 # STEP 4*: SPECIFIC BOT COMMAND TO ADD DATA INTO SQLITE TABLE
@@ -160,38 +255,50 @@ async def prepareSQLTable(interaction: discord.Interaction):
     # final command to execute using cursor.execute()
     command = "INSERT INTO users (username, bad_standing_points, reasons) VALUES "
 
-    # fetch values from event attendance - check to see if there are any "x"
-    X_RANGE = os.getenv('X_CHECK_RANGE')
-    x_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=X_RANGE).execute()
-    x_check = x_fetch.get('values', [])
-
-    NAME_RANGE = os.getenv('NAME_RANGE')
-    names_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=NAME_RANGE).execute()
-    names = names_fetch.get('values', [])
-
-    SCORES_RANGE = os.getenv('SCORES_RANGE')
-    scores_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=SCORES_RANGE).execute()
-    scores = scores_fetch.get('values', [])
-
-    OTHER_HOURS_RANGE = os.getenv('OTHER_HOURS_RANGE')
-    other_hours_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=OTHER_HOURS_RANGE).execute()
-    other_hours = other_hours_fetch.get('values', [])
-
-    reason: str = ""
+    # this chapter's spreadsheet & ranges
+    tenant = tenants.get(interaction.guild_id)
+    config = tenant.config
+    X_RANGE = config.x_check_range
+
+    # acknowledge 1st - reading the sheet may have to wait for a free slot in this chapter's budget
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    # every Google call in 1 worker thread, under this chapter's budget
+    def read_sheet():
+        names_fetch = tenant.sheet.values().get(spreadsheetId=config.spreadsheet_id, range=config.name_range).execute()
+        scores_fetch = tenant.sheet.values().get(spreadsheetId=config.spreadsheet_id,
+                                                 range=config.scores_range).execute()
+        other_hours_fetch = tenant.sheet.values().get(spreadsheetId=config.spreadsheet_id,
+                                                      range=config.other_hours_range).execute()
+        other_hours = other_hours_fetch.get('values', [])
+
+        # fetch event titles from event attendance - the "x"/"t" marks under them are streamed in blocks below
+        event_titles = read_event_titles(tenant.sheet, config.spreadsheet_id, X_RANGE)
+        if not event_titles:
+            return names_fetch.get('values', []), scores_fetch.get('values', []), other_hours, event_titles, []
+
+        # each Brother's attendance bitmaps, in roster order
+        attendance = [(missed[j], late[j])
+                      for start, missed, late in iter_attendance_blocks(tenant.sheet, config.spreadsheet_id, X_RANGE,
+                                                                        len(other_hours))
+                      for j in range(len(missed))]
+        return names_fetch.get('values', []), scores_fetch.get('values', []), other_hours, event_titles, attendance
 
     try:
-        event_titles = x_check[0]
-    except IndexError:
-        await interaction.response.send_message("no event created - this message is only visible to you and will "
-                                                "terminate in T-minus 60 seconds", ephemeral=True, delete_after=60)
+        names, scores, other_hours, event_titles, attendance = await tenant.run(read_sheet)
+    except RangeError as e:
+        await send_followup(interaction, f"{e} - please go annoy Brother Scribe. This message is only visible to you "
+                                         f"and will terminate in T-minus 90 seconds", delete_after=90)
+        return
+    if not event_titles:
+        message = await interaction.followup.send("no event created - this message is only visible to you and will "
+                                                  "terminate in T-minus 60 seconds", ephemeral=True, wait=True)
+        await message.delete(delay=60)
+        return
 
     # fetch bad_standing_points, reasons and names of each Brother
-    for k in range(len(other_hours)):
-        for i in range(len(x_check[1:][k])):
-            if x_check[1:][k][i] == "x":
-                reason += "-missed " + event_titles[i] + " (+1)\n"
-            elif x_check[1:][k][i] == "t":
-                reason += "-late to " + event_titles[i] + " (+0.5)\n"
+    for k, (missed_bits, late_bits) in enumerate(attendance):
+        reason: str = attendance_reason(event_titles, missed_bits, late_bits)
         # checking for tabling, study, committee volunteering, tutoring hours
         if int(other_hours[k][3]) > 0:  # tabling hours
             reason += f'-missed tabling hours: {other_hours[k][3]} (+{int(other_hours[k][3])/4})\n'
@@ -212,11 +319,11 @@ async def prepareSQLTable(interaction: discord.Interaction):
                            f'   reasons = excluded.reasons;')
             reason = ""
         except Exception as e:
-            await interaction.response.send_message(f"An error occurred: {e}", ephemeral=True, delete_after=90)
+            await interaction.followup.send(f"An error occurred: {e}", ephemeral=True)
 
     cursor.execute("SELECT * FROM users")
     connection.close()
-    await interaction.response.send_message("table updated successfully")
+    await interaction.followup.send("table updated successfully", ephemeral=True)
     # return NotImplementedError("no code here yet...")
 
 
@@ -226,122 +333,75 @@ async def noteCommand(interaction: discord.Interaction):
     rowIndex: int = 1
     columnIndex: int = 1
 
-    # fetch values from event attendance - check to see if there are any "x"
-    X_RANGE = os.getenv('X_CHECK_RANGE')
-    x_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=X_RANGE).execute()
-    x_check = x_fetch.get('values', [])
-
-    NAME_RANGE = os.getenv('NAME_RANGE')
-    names_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=NAME_RANGE).execute()
-    names = names_fetch.get('values', [])
-
-    SCORES_RANGE = os.getenv('SCORES_RANGE')
-    scores_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=SCORES_RANGE).execute()
-    scores = scores_fetch.get('values', [])
-
-    OTHER_HOURS_RANGE = os.getenv('OTHER_HOURS_RANGE')
-    other_hours_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=OTHER_HOURS_RANGE).execute()
-    other_hours = other_hours_fetch.get('values', [])
-
-    # "reason" string to hold bad standing reasons to add to cells' notes
-    reason: str = ""
-
-    # list of requests to hold all cell
-    # update requests
-    requests = []
-
-    # add reason for every "x" found
-    # check to see if there's any event added - so that there's no out-of-index error when creating event_titles
-    try:
-        event_titles = x_check[0]
-    except IndexError:
-        await interaction.response.send_message("no event created - this message is only visible to you and will "
-                                                "terminate in T-minus 60 seconds", ephemeral=True, delete_after=60)
-
-    # Fetch spreadsheet metadata - for retrieving sheet_id of the sheet we're operating in
-    spreadsheet = sheet.get(spreadsheetId=SPREADSHEET_ID).execute()
-
-    # retrieve the correct sub-sheet's sheet_id in the spreadsheet before making edit requests
-    if len(spreadsheet.get('sheets', [])) == 0:  # if somehow there's no sheet created in spreadsheet
-        raise ValueError("no sheet created")
-    sheet_id = spreadsheet.get('sheets', [])[0]['properties']['sheetId']  # assumes 1st sheet in spreadsheet is ALWAYS
-    # active_rolls
+    # this chapter's spreadsheet, ranges & caches
+    tenant = tenants.get(interaction.guild_id)
 
     # apparently bot times out if response command is not sent immediately after bot command is processed
     # defer() function lets bot know command is still being processed & keeps it from timing out
-    # await interaction.response.defer()
+    # (every Google call below may wait on the chapter's API budget & failed chunks get retried with backoff)
+    await interaction.response.defer(ephemeral=True, thinking=True)
 
-    """
-    the "other-hours" 2d array will always have the same number of rows as there are Brothers
-    However, the x_check[1:] 2d table may not have as many rows (e.g. if a certain Brother doesn't 
-    miss and is not late to any event. Therefore applying indices for other_hours to x_check will cause
-    out_of_index error
-    
-    fixed with the if line at line 283
-    """
-    for k in range(len(other_hours)):
-        if k < len(x_check[1:]):
-            for i in range(len(x_check[1:][k])):
-                if x_check[1:][k][i] == "x":
-                    reason += "-missed " + event_titles[i] + " (+1)\n"
-                elif x_check[1:][k][i] == "t":
-                    reason += "-late to " + event_titles[i] + " (+0.5)\n"
-        # checking for tabling, study, committee volunteering, tutoring hours
-        if float(other_hours[k][4]) > 0:  # tabling hours
-            reason += f'-Extra tabling hours: {other_hours[k][4]} (-{int(other_hours[k][4])})\n'
-        if float(other_hours[k][3]) > 0:  # tabling hours
-            reason += f'-missed tabling hours: {other_hours[k][3]} (+{int(other_hours[k][3])/4})\n'
-        if float(other_hours[k][2]) > 0:  # study hours
-            reason += f'-study hours attended: {other_hours[k][2]} (-{int(other_hours[k][2])/4})\n'
-        if float(other_hours[k][1]) > 0:  # committee volunteering hours
-            reason += f'-committee volunteering hours done: {other_hours[k][1]} (-{other_hours[k][1]})\n'
-        if float(other_hours[k][0]) > 0:  # tutored hours
-            reason += f'-tutoring hours done: {other_hours[k][0]} (-{other_hours[k][0]})\n'
-
-        # Create the request body to add the note to the specified cell
-        requests.append({
-            'updateCells': {
-                'range': {
-                    'sheetId': sheet_id,  # value 0 will default to the first sheet; change if needed
-                    # (e.g. if sheet's name is changed)
-                    'startRowIndex': rowIndex,  # Convert A1 notation to row index (0-based)
-                    'endRowIndex': rowIndex + 1,  # One row
-                    'startColumnIndex': columnIndex,  # Convert column letter to index (0-based)
-                    'endColumnIndex': columnIndex + 1  # One column
-                },
-                'rows': [{
-                    'values': [{
-                        'note': reason if reason else ''  # this cleans note if the 'x''s are somehow deleted
-                    }]
-                }],
-                'fields': 'note'
-            }
-        })
-
-        rowIndex += 1
-        reason = ""
-
-    # Execute the batch update request
-    body = {
-        'requests': requests
-    }
+    # check to see if there's any event added - every Brother's record comes back with the "x"/"t" marks as bitmaps
+    try:
+        events, standings = await fetch_standings(tenant)
+    except RangeError as e:  # X_CHECK_RANGE isn't a tab name or A1 notation
+        await send_followup(interaction, f"{e} - please go annoy Brother Scribe. This message is only visible to you "
+                                         f"and will terminate in T-minus 90 seconds", delete_after=90)
+        return
+    if not events:
+        await send_followup(interaction, "no event created - this message is only visible to you and will "
+                                         "terminate in T-minus 60 seconds")
+        return
 
+    # retrieve the correct sub-sheet's sheet_id in the spreadsheet before making edit requests
+    # (looked up by tab title from cached metadata - only re-fetched when the tab structure changes)
     try:
-        # if there's no content in request body (i.e. if no one is late to anything at all & no x's is marked)
-        # there will be an HttpError 400: "must specify at least one request" - nothing to worry about
-        sheet.batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body).execute()
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        await interaction.response.send_message(f"An error occurred: {e}", ephemeral=True, delete_after=90)
+        sheet_id = await tenant.run(tenant.sheet_metadata.get_sheet_id, tenant.note_sheet_title)
+    except ValueError:
+        # the tab named by NOTE_SHEET_TITLE/NAME_RANGE (or the chapter config) got renamed or deleted
+        missing = f'a tab named "{tenant.note_sheet_title}"' if tenant.note_sheet_title else 'any tab'
+        await send_followup(interaction, f"I couldn't find {missing} in the spreadsheet, so no notes were added - "
+                                         f"please go annoy Brother Scribe. This message is only visible to you and "
+                                         f"will terminate in T-minus 90 seconds", delete_after=90)
+        return
 
-    # confirm message that notes have been added
-    await interaction.response.send_message(f"Notes added to cells successfully.", ephemeral=True, delete_after=60)
+    # list of notes (1 per Brother, top to bottom) - all written with a single updateCells request at the end
+    # an empty string cleans note if the 'x''s are somehow deleted
+    notes: list[str] = [member.reason() for member in standings]
+
+    # 1 request over the whole column (rows in a "rows" array) instead of 1 request & range per cell
+    requests = [note_column_request(sheet_id, columnIndex, rowIndex, notes)] if notes else []
+
+    # Execute the batch update request - adjacent notes get merged into range updates & sent in bounded chunks
+    async with tenant.budget:
+        failures = await write_batch_update(tenant.sheet, tenant.config.spreadsheet_id, requests)
+
+    # reply exactly once - either a confirmation or which rows didn't get their notes
+    if failures:
+        # a rejected sheetId means the tab got deleted/re-created - drop cached metadata so next run re-fetches it
+        tenant.sheet_metadata.invalidate()
+        failed_rows = format_row_ranges([row for rows, e in failures for row in rows])
+        message = await interaction.followup.send(f"An error occurred - notes for row(s) {failed_rows} were not "
+                                                  f"updated: {failures[0][1]}", ephemeral=True, wait=True)
+        await message.delete(delay=90)
+    else:
+        # confirm message that notes have been added
+        message = await interaction.followup.send(f"Notes added to cells successfully.", ephemeral=True, wait=True)
+        await message.delete(delay=60)
 
     # print(notes_dict)  # for debugging
     # print(scores_dict)  # for debugging
 
 
 # STEP 4*: SPECIFIC BOT COMMAND TO RETURN BAD STANDING STATUS TO USER
+# compiled once here - each check only fills in the member's name, points & reasons
+BAD_STANDING_CHECK_TEMPLATE: MessageTemplate = compile_template(
+    "hey {name}! you currently have {points} points, which means you're{negation} in bad standing!\nreasons: \n\n"
+    "{reasons}\nif you have any questions please go annoy brother Scribe, I am but a vessel of their intelligence.\n"
+    "This message will terminate in T-minus 90 seconds - you can use /bad_standing_check command to check your "
+    "bad-standing status anytime", STANDING_FIELDS)
+
+
 @bot.tree.command(name='bad_standing_check')
 async def badStandingCheck(interaction: discord.Interaction):
     # process display name - remove all Officer position indicators
@@ -359,100 +419,68 @@ async def badStandingCheck(interaction: discord.Interaction):
     2nd edit - (maybe) a better way: I could scan for the user's name, then look up that user's row in the sheet, 
     then recreate all the notes for that user and send that
     '''
-    # fetch values from event attendance - check to see if there are any "x"
-    X_RANGE = os.getenv('X_CHECK_RANGE')
-    x_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=X_RANGE).execute()
-    x_check = x_fetch.get('values', [])
-
-    NAME_RANGE = os.getenv('NAME_RANGE')
-    names_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=NAME_RANGE).execute()
-    names = names_fetch.get('values', [])
-
-    SCORES_RANGE = os.getenv('SCORES_RANGE')
-    scores_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=SCORES_RANGE).execute()
-    scores = scores_fetch.get('values', [])
-
-    OTHER_HOURS_RANGE = os.getenv('OTHER_HOURS_RANGE')
-    other_hours_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=OTHER_HOURS_RANGE).execute()
-    other_hours = other_hours_fetch.get('values', [])
-
-    reason: str = ""
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        events, standings = await fetch_standings(tenants.get(interaction.guild_id))
+    except RangeError as e:  # X_CHECK_RANGE isn't a tab name or A1 notation
+        await send_followup(interaction, f"{e} - please go annoy Brother Scribe. This message is only visible to you "
+                                         f"and will terminate in T-minus 90 seconds", delete_after=90)
+        return
+    if not events:
+        await send_followup(interaction, "no event created - this message is only visible to you and will "
+                                         "terminate in T-minus 60 seconds")
+        return
 
-    # get the row index of the user's name in the sheet
-    row = names.index([name])  # taking into account first row of event_titles
+    # look up the user's record by their name in the sheet
+    member = next((standing for standing in standings if standing.name == name), None)
+    if member is None:
+        await send_followup(interaction, f"I couldn't find {name} in the sheet - please go annoy Brother Scribe. "
+                                         f"This message will terminate in T-minus 60 seconds")
+        return
 
-    try:
-        event_titles = x_check[0]
-    except IndexError:
-        await interaction.response.send_message("no event created - this message is only visible to you and will "
-                                                "terminate in T-minus 60 seconds", ephemeral=True, delete_after=60)
-
-    if len(x_check[row+1]) != 0:
-        for i in range(len(x_check[row+1])):
-            if x_check[row+1][i] == "x":  # row+1 takes into account mismatch caused by 1st row of event_titles
-                reason += "-missed " + event_titles[i] + " (+1)\n"
-            elif x_check[row+1][i] == "t":
-                reason += "-late to " + event_titles[i] + " (+0.5)\n"
-
-    # checking for tabling, study, committee volunteering, tutoring hours
-    if float(other_hours[row][4]) > 0:  # tabling hours
-        reason += f'-Extra tabling hours: {other_hours[row][4]} (-{int(other_hours[row][4])})\n'
-    if float(other_hours[row][3]) > 0:  # tabling hours
-        reason += f'-missed tabling hours: {other_hours[row][3]} (+{int(other_hours[row][3])/4})\n'
-    if float(other_hours[row][2]) > 0:  # study hours
-        reason += f'-study hours attended: {other_hours[row][2]} (-{int(other_hours[row][2])/4})\n'
-    if float(other_hours[row][1]) > 0:  # committee volunteering hours
-        reason += f'-committee volunteering hours done: {other_hours[row][1]} (-{other_hours[row][1]})\n'
-    if float(other_hours[row][0]) > 0:  # tutored hours
-        reason += f'-tutoring hours done: {other_hours[row][0]} (-{other_hours[row][0]})\n'
-
-    # if "reason" string is still empty after all that - no reason added
-    if not reason: reason = "None added"
-
-    good_standing_check: str = ' not' if float(scores[row][0]) < 2 else ""
-
-    response: str = f"hey {name}! you currently have {scores[row][0]} points, which means " \
-                    f"you're{good_standing_check} in bad standing!\nreasons: \n\n{reason}\nif you have any questions" \
-                    f" please go annoy brother Scribe, I am but a vessel of their intelligence.\nThis message" \
-                    f" will terminate in T-minus 90 seconds - you can use /bad_standing_check command to check" \
-                    f" your bad-standing status anytime"
+    # if reason is still empty after checking attendance & hours - no reason added
+    response: str = BAD_STANDING_CHECK_TEMPLATE.render(name=name, points=member.points,
+                                                       negation="" if member.in_bad_standing() else ' not',
+                                                       reasons=member.reason() or "None added")
 
     try:
         # send a DM to user instead of a public message in channel with user.send()
         await interaction.user.send(response, delete_after=90)
-        await interaction.response.send_message(
-            "I DM'd your status, this message is only visible to you and will terminate in T-minus 60 seconds",
-            ephemeral=True, delete_after=60)
+        await send_followup(interaction, "I DM'd your status, this message is only visible to you and will "
+                                         "terminate in T-minus 60 seconds")
     except discord.Forbidden:
-        await interaction.response.send_message(
-            "I couldn't DM you the status. Please check your DM settings or annoy Brother Scribe. "
-            "This message will terminate in T-minus 60 seconds",
-            ephemeral=True, delete_after=60)
+        await send_followup(interaction, "I couldn't DM you the status. Please check your DM settings or annoy "
+                                         "Brother Scribe. This message will terminate in T-minus 60 seconds")
 
 
 # STEP 4*: SPECIFIC BOT COMMAND TO SCHEDULE TIMELY MESSAGES
 # helper function to print message
-async def print_message(message: str, file_path: str, input_channel: discord.TextChannel):
-    edited = "\n".join(message.split("[br]"))  # "[br]" my own syntax for line breaks ("\n\n") - change if needed
-
+# (template was compiled when the job was scheduled - see templates.py for "[br]" & placeholders)
+async def print_message(template: MessageTemplate, file_path: str, input_channel: discord.TextChannel):
     if input_channel:
         if file_path.lower() != "none":
             file = discord.File(file_path.strip('"'))  # remove quotation marks - file paths don't have ""
-            await input_channel.send(edited, file=file)
+            await input_channel.send(template.text, file=file)
         else:
-            await input_channel.send(edited)
+            await input_channel.send(template.text)
 
 
 # helper function to dm message
-async def print_dm(message: str, file_path: str, guild: discord.Guild, role_name: str):
+async def print_dm(template: MessageTemplate, file_path: str, guild: discord.Guild, role_name: str,
+                   members: Sequence[discord.Member] = None):
     role = discord.utils.get(guild.roles, name=role_name)  # get role object from input role name
     print(role)  # for debugging
-    edited = "\n".join(message.split("[br]"))
     # filter and put all members with same role object into a list
-    members_with_roles = [member for member in guild.members if role in member.roles and not member.bot]
+    # (members can be passed in when guild.members isn't cached - e.g. in the scheduler worker)
+    members_with_roles = [member for member in (guild.members if members is None else members)
+                          if role in member.roles and not member.bot]
 
     for member in members_with_roles:
         print(member.roles)  # for debugging
+        edited = template.render(name=member.display_name)  # same str object every time if there's no {name}
+        if dm_digest.enabled:  # merged with this member's other DMs & sent once their digest window closes
+            dm_digest.add(member, edited, None if file_path.lower() == "none" else file_path)
+            continue
         try:
             if file_path.lower() != "none":
                 file = discord.File(file_path.strip('"'))  # remove quotation marks - file paths don't have ""
@@ -494,6 +522,46 @@ async def role_name_autocomplete(interaction: discord.Interaction, current: str)
     ]
 
 
+# helper function to run a scheduled job described by ids (see jobs.py) - client is the bot itself in single mode,
+# or the scheduler worker's REST-only client, which has nothing cached & has to fetch everything
+async def run_scheduled_job(kind: str, job_args: dict, client: discord.Client):
+    if kind == 'message':
+        channel = None
+        if job_args['channel_id'] is not None:
+            channel = client.get_channel(job_args['channel_id']) or await client.fetch_channel(job_args['channel_id'])
+        await print_message(job_args['template'], job_args['file_path'], channel)
+        return
+
+    guild = client.get_guild(job_args['guild_id'])
+    members = None
+    if guild is None:
+        guild = await client.fetch_guild(job_args['guild_id'])
+        members = [member async for member in guild.fetch_members(limit=None)]
+
+    if kind == 'dm':
+        await print_dm(job_args['template'], job_args['file_path'], guild, job_args['role_name'], members)
+    elif kind == 'bad_status':
+        await print_bad_status(guild, members)
+
+
+# helper function to compile a job's message once, when it's scheduled - the compiled template is stored in the
+# scheduler's copy of job_args (the queue only ever holds the plain message text)
+def with_template(kind: str, job_args: dict) -> dict:
+    if kind == 'message':
+        return {**job_args, 'template': compile_template(job_args['message'])}
+    if kind == 'dm':
+        return {**job_args, 'template': compile_template(job_args['message'], DM_FIELDS)}
+    return job_args
+
+
+# helper function to schedule a job - runs it in this process, or queues it for the scheduler worker in sharded mode
+def schedule_job(kind: str, trigger: dict, job_args: dict):
+    if DEPLOY_MODE == 'sharded':
+        enqueue_job(kind, trigger, job_args)
+    else:
+        scheduler.add_job(run_scheduled_job, build_trigger(trigger), args=[kind, with_template(kind, job_args), bot])
+
+
 # actual scheduler function
 @bot.tree.command(name='set_timely_message')
 @app_commands.autocomplete(channel_name=channel_name_autocomplete)
@@ -501,12 +569,8 @@ async def setTimelyMessage(interaction: discord.Interaction, day: str, hour: str
                            message: str, file_path: str, channel_name: str):
     channel = discord.utils.get(interaction.guild.text_channels, name=channel_name)
 
-    scheduler.add_job(print_message, CronTrigger(day=None if day.lower() == "none" else day,
-                                                 hour=None if hour.lower() == "none" else hour,
-                                                 minute=None if minute.lower() == "none" else minute,
-                                                 second=None if second.lower() == "none" else second,
-                                                 timezone=pytz.timezone('America/Los_Angeles')),
-                      args=[message, file_path, channel])
+    schedule_job('message', cron_spec(day, hour, minute, second),
+                 {'channel_id': channel.id if channel else None, 'message': message, 'file_path': file_path})
     await interaction.response.send_message(f'message scheduled: "{message}" with file: {file_path}. '
                                             f'Message is only visible to you and will terminate in T-minus 60 seconds',
                                             ephemeral=True, delete_after=60)
@@ -543,7 +607,8 @@ async def setOneTimeMessage(interaction: discord.Interaction, date_time: str, me
     # get channel from channel_name
     channel = discord.utils.get(interaction.guild.text_channels, name=channel_name)
 
-    scheduler.add_job(print_message, DateTrigger(run_date=send_time), args=[message, file_path, channel])
+    schedule_job('message', date_spec(send_time),
+                 {'channel_id': channel.id if channel else None, 'message': message, 'file_path': file_path})
     await interaction.response.send_message(f'one-time message scheduled at {send_time}: "{message}", '
                                             f'with file: {file_path}. Message is only visible to you and will '
                                             f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
@@ -555,12 +620,9 @@ async def setOneTimeMessage(interaction: discord.Interaction, date_time: str, me
 async def setTimelyDM(interaction: discord.Interaction, day: str, hour: str, minute: str, second: str,
                       message: str, file_path: str, role_name: str):
 
-    scheduler.add_job(print_dm, CronTrigger(day=None if day.lower() == "none" else day,
-                                            hour=None if hour.lower() == "none" else hour,
-                                            minute=None if minute.lower() == "none" else minute,
-                                            second=None if second.lower() == "none" else second,
-                                            timezone=pytz.timezone('America/Los_Angeles')),
-                      args=[message, file_path, interaction.guild, role_name])
+    schedule_job('dm', cron_spec(day, hour, minute, second),
+                 {'guild_id': interaction.guild.id, 'message': message, 'file_path': file_path,
+                  'role_name': role_name})
 
     await interaction.response.send_message(f'message scheduled: "{message}" with file: {file_path}. '
                                             f'Message is only visible to you and will terminate in T-minus 60 seconds',
@@ -576,8 +638,9 @@ async def setOneTimeDM(interaction: discord.Interaction, date_time: str, message
     send_time = datetime.strptime(date_time, '%Y-%m-%d %H:%M')
     send_time = pacific.localize(send_time)
 
-    scheduler.add_job(print_dm, DateTrigger(run_date=send_time),
-                      args=[message, file_path, interaction.guild, role_name])
+    schedule_job('dm', date_spec(send_time),
+                 {'guild_id': interaction.guild.id, 'message': message, 'file_path': file_path,
+                  'role_name': role_name})
     await interaction.response.send_message(f'one-time message scheduled at {send_time}: "{message}", '
                                             f'with file: {file_path}. Message is only visible to you and will '
                                             f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
@@ -585,65 +648,37 @@ async def setOneTimeDM(interaction: discord.Interaction, date_time: str, message
 
 
 # helper function to send dm's about member's bad-standing status
-async def print_bad_status(guild: discord.Guild):
-    # fetch values from event attendance - check to see if there are any "x"
-    X_RANGE = os.getenv('X_CHECK_RANGE')
-    x_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=X_RANGE).execute()
-    x_check = x_fetch.get('values', [])
-
-    NAME_RANGE = os.getenv('NAME_RANGE')
-    names_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=NAME_RANGE).execute()
-    names = names_fetch.get('values', [])
+WEEKLY_STATUS_TEMPLATE: MessageTemplate = compile_template(
+    "hey {name}, here is your weekly bad-standing status update! you currently have {points} points, which means "
+    "you're{negation} in bad standing!\nreasons: \n\n{reasons}\nif you have any questions please go annoy brother "
+    "Scribe, I am but a vessel of their intelligence.\nyou can use command /bad_standing_check to check you status "
+    "any time!", STANDING_FIELDS)
 
-    SCORES_RANGE = os.getenv('SCORES_RANGE')
-    scores_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=SCORES_RANGE).execute()
-    scores = scores_fetch.get('values', [])
 
-    OTHER_HOURS_RANGE = os.getenv('OTHER_HOURS_RANGE')
-    other_hours_fetch = sheet.values().get(spreadsheetId=SPREADSHEET_ID, range=OTHER_HOURS_RANGE).execute()
-    other_hours = other_hours_fetch.get('values', [])
+async def print_bad_status(guild: discord.Guild, members: Sequence[discord.Member] = None):
+    # every Brother's record - reason text is only rendered for members we actually DM below
+    try:
+        events, standings = await fetch_standings(tenants.get(guild.id))
+    except RangeError as e:  # X_CHECK_RANGE isn't a tab name or A1 notation
+        print(f"weekly bad-standing DMs for {guild.id} not sent: {e}")
+        return
+    standings_by_name = {standing.name: standing for standing in standings}
 
-    # filter and put all members with same role object into a list
-    # members_lst = [member for member in guild.members if [member.display_name] in names]
+    # filter and put all members whose name is in the sheet into a dict
     members_lst = {}
-    for member in guild.members:
+    for member in (guild.members if members is None else members):
         name: str = " ".join([elem for elem in member.display_name.split() if "!" not in elem and elem.isalnum()])
-        if [name] in names: members_lst[member] = name
-
-    reason: str = ""
-    event_titles = x_check[0]
+        if name in standings_by_name: members_lst[member] = name
 
     for member in members_lst:
         username = members_lst[member]
-        row = names.index([username])
-
-        if not x_check[row+1]: reason = "None added"
-        else:
-            for i in range(len(x_check[row+1])):
-                if x_check[row+1][i] == "x":  # row+1 takes into account mismatch caused by 1st row of event_titles
-                    reason += "-missed " + event_titles[i] + " (+1)\n"
-                elif x_check[row+1][i] == "t":
-                    reason += "-late to " + event_titles[i] + " (+0.5)\n"
-            # checking for tabling, study, committee volunteering, tutoring hours
-            if float(other_hours[row][4]) > 0:  # tabling hours
-                reason += f'-Extra tabling hours: {other_hours[row][4]} (-{int(other_hours[row][4])})\n'
-            if float(other_hours[row][3]) > 0:  # tabling hours
-                reason += f'-missed tabling hours: {other_hours[row][3]} (+{int(other_hours[row][3]) / 4})\n'
-            if float(other_hours[row][2]) > 0:  # study hours
-                reason += f'-study hours attended: {other_hours[row][2]} (-{int(other_hours[row][2]) / 4})\n'
-            if float(other_hours[row][1]) > 0:  # committee volunteering hours
-                reason += f'-committee volunteering hours done: {other_hours[row][1]} (-{other_hours[row][1]})\n'
-            if float(other_hours[row][0]) > 0:  # tutored hours
-                reason += f'-tutoring hours done: {other_hours[row][0]} (-{other_hours[row][0]})\n'
-
-        good_standing_check: str = ' not' if float(scores[row][0]) < 2 else ""
-
-        response: str = f"hey {username}, here is your weekly bad-standing status update! you currently have " \
-                        f"{scores[row][0]} points, which means you're{good_standing_check} in bad standing!\n" \
-                        f"reasons: \n\n{reason}\nif you have any questions please go annoy brother Scribe, " \
-                        f"I am but a vessel of their intelligence.\n" \
-                        f"you can use command /bad_standing_check to check you status any time!"
-        reason = ""  # reset reason for next iteration
+        standing = standings_by_name[username]
+        response: str = WEEKLY_STATUS_TEMPLATE.render(name=username, points=standing.points,
+                                                      negation="" if standing.in_bad_standing() else ' not',
+                                                      reasons=standing.reason() or "None added")
+        if dm_digest.enabled:
+            dm_digest.add(member, response)
+            continue
         try:
             await member.send(response)
             print("function ran successfully")  # for debugging
@@ -657,12 +692,7 @@ async def print_bad_status(guild: discord.Guild):
 @bot.tree.command(name='timely_bad_standing_dm')
 async def timelyBadStandingDM(interaction: discord.Interaction, day: str, hour: str, minute: str, second: str):
 
-    scheduler.add_job(print_bad_status, CronTrigger(day=None if day.lower() == "none" else day,
-                                                    hour=None if hour.lower() == "none" else hour,
-                                                    minute=None if minute.lower() == "none" else minute,
-                                                    second=None if second.lower() == "none" else second,
-                                                    timezone=pytz.timezone('America/Los_Angeles')),
-                      args=[interaction.guild])
+    schedule_job('bad_status', cron_spec(day, hour, minute, second), {'guild_id': interaction.guild.id})
 
     await interaction.response.send_message(f'message scheduled. Message is only visible to you and will '
                                             f'terminate in T-minus 90 seconds', ephemeral=True, delete_after=90)
@@ -671,12 +701,59 @@ async def timelyBadStandingDM(interaction: discord.Interaction, day: str, hour:
 # STEP 4*: SPECIFIC BOT COMMAND TO CANCEL ALL MESSAGES
 @bot.tree.command(name='cancel_all_scheduled_messages')
 async def cancelAllMessages(interaction: discord.Interaction):
-    scheduler.remove_all_jobs()
+    if DEPLOY_MODE == 'sharded':
+        enqueue_remove_all()
+    else:
+        scheduler.remove_all_jobs()
     await interaction.response.send_message("all scheduled messages have been canceled. Message is only visible "
                                             "to you and will terminate in T-minus 60 seconds",
                                             ephemeral=True, delete_after=60)
 
 
+# STEP 4*: ADMIN-ONLY BOT COMMAND TO POINT A CHAPTER'S SERVER AT ITS OWN SPREADSHEET & CALENDAR
+@bot.tree.command(name='set_chapter_config')
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+async def setChapterConfig(interaction: discord.Interaction, spreadsheet_id: str, calendar_id: str,
+                           x_check_range: str, name_range: str, scores_range: str, other_hours_range: str,
+                           note_sheet_title: str = None, max_concurrent_calls: int = MAX_CONCURRENT_CALLS):
+    # a chapter can lower its API budget, never raise it past TENANT_MAX_CONCURRENT_CALLS (see tenants.py)
+    max_concurrent_calls = max(1, min(max_concurrent_calls, MAX_CONCURRENT_CALLS))
+    config = TenantConfig(spreadsheet_id=spreadsheet_id, calendar_id=calendar_id, x_check_range=x_check_range,
+                          name_range=name_range, scores_range=scores_range, other_hours_range=other_hours_range,
+                          note_sheet_title=note_sheet_title, max_concurrent_calls=max_concurrent_calls)
+    # catch typos now instead of when the weekly DM job runs
+    try:
+        for a1_range in (x_check_range, name_range, scores_range, other_hours_range):
+            split_a1_range(a1_range)
+    except RangeError as e:
+        await interaction.response.send_message(f'{e}. Nothing was saved - message is only visible to you and will '
+                                                f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
+        return
+    try:
+        tenants.save(interaction.guild_id, config)
+    except ValueError as e:  # someone else's spreadsheet/calendar
+        await interaction.response.send_message(f'{e}. Nothing was saved - message is only visible to you and will '
+                                                f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
+        return
+    await interaction.response.send_message(f'this server now uses spreadsheet {spreadsheet_id} and calendar '
+                                            f'{calendar_id}. Message is only visible to you and will terminate in '
+                                            f'T-minus 60 seconds', ephemeral=True, delete_after=60)
+
+
+# STEP 4*: ADMIN-ONLY BOT COMMAND TO CHECK EVENT-LOOP LAG & WHAT BLOCKED THE BOT RECENTLY
+@bot.tree.command(name='loop_lag')
+@app_commands.default_permissions(administrator=True)
+async def loopLag(interaction: discord.Interaction):
+    report: str = watchdog.report()
+    if dm_digest.enabled:
+        report += "\n" + dm_digest.report()
+    if len(report) > 1900:  # discord messages max out at 2000 characters
+        report = report[:1900] + "\n..."
+    await interaction.response.send_message(f"```\n{report}\n```\nMessage is only visible to you and will terminate "
+                                            f"in T-minus 90 seconds", ephemeral=True, delete_after=90)
+
+
 # STEP 4*: SPECIFIC BOT COMMAND TO SCHEDULE OTHER BOT COMMANDS
 # helper function to deal with the function objects in dictionary
 '''
@@ -742,7 +819,8 @@ async def guidelines(interaction: discord.Interaction):
                     f'- "test" command: no input needed - for Scribe-only purposes\n' \
                     f'- "set-dm" command: schedules a DM to all people under any certain role' \
                     f' - date_time: enter date-time of message with format YYYY-MM-DD HH:MM (use 24hr system)\n' \
-                    f' - message: message to send at scheduled time\n' \
+                    f' - message: message to send at scheduled time - "[br]" starts a new line & "{{name}}" becomes ' \
+                    f'each member\'s server nickname\n' \
                     f' - file_path: copy/paste path of file you want to send from your computer OR "none" ' \
                     f'for no file\n' \
                     f' - role_name: name of role you want your DM to reach to\n' \
@@ -750,6 +828,9 @@ async def guidelines(interaction: discord.Interaction):
                     f' - role_name: name of role you want your DM to reach to\n' \
                     f' - all other inputs use similar format as "set_timely_message_ command\n' \
                     f'- "timely_bad_standing_dm" command: for Scribe-only purposes - DO NOT TOUCH!\n' \
+                    f'- "set_chapter_config" command: admin-only - sets which spreadsheet, ranges & calendar this ' \
+                    f'server uses\n' \
+                    f'- "loop_lag" command: admin-only - shows how laggy the bot is & what blocked it recently\n' \
                     f'refer to Brother Scribe for more instructions if needed!\n' \
                     f'message will terminate in T-minus 90 seconds' \
 
@@ -763,9 +844,12 @@ async def guidelines(interaction: discord.Interaction):
 @bot.tree.command(name='events_check')
 async def notifyEvents(interaction: discord.Interaction):
     now = datetime.utcnow().isoformat() + 'Z'  # 'Z' indicates UTC time
-    events_result = service_calendars.events().list(calendarId='bkshlhck01pl08tgfif8qj89no@group.calendar.google.com',
-                                                    timeMin=now, maxResults=29, singleEvents=True,
-                                                    orderBy='startTime').execute()
+    tenant = tenants.get(interaction.guild_id)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    events_result = await tenant.run(lambda: tenant.calendar.events().list(calendarId=tenant.config.calendar_id,
+                                                                           timeMin=now, maxResults=29,
+                                                                           singleEvents=True,
+                                                                           orderBy='startTime').execute())
     # events_result is a "response body" (kinda like the request body we created in note command)
 
     """
@@ -775,9 +859,8 @@ async def notifyEvents(interaction: discord.Interaction):
     events = events_result['items']  # I can either use .get() or "[]" to access categories in response body
 
     if not events:
-        await interaction.response.send_message("no upcoming events found. This message is only visible "
-                                                "to you and will terminate in T-minus 60 seconds",
-                                                ephemeral=True, delete_after=60)
+        await send_followup(interaction, "no upcoming events found. This message is only visible "
+                                         "to you and will terminate in T-minus 60 seconds")
 
     # this else statement is really important - if this is not here, both response messages will be sent no matter
     # what and will result in the "message has already been responded to before" error
@@ -804,9 +887,9 @@ async def notifyEvents(interaction: discord.Interaction):
             event_list.append(f"{start} - {event['summary']} (Ends at {end})")
 
         response: str = "\n".join(event_list)
-        await interaction.response.send_message(f'here are the {len(event_list)} events upcoming events: \n{response}\n'
-                                                f'This message is only visible to you and will terminate in '
-                                                f'T-minus 60 seconds', ephemeral=True, delete_after=60)
+        await send_followup(interaction, f'here are the {len(event_list)} events upcoming events: \n{response}\n'
+                                         f'This message is only visible to you and will terminate in '
+                                         f'T-minus 60 seconds')
         print(
             len(response + 'here are the events upcoming events: \n\nThis message is only visible to you and will terminate in T-minus 60 seconds'))
 
@@ -900,14 +983,16 @@ async def insertEvent(interaction: discord.Interaction, title: str, location: st
             'timeZone': 'America/Los_Angeles',
         },
     }
+    await interaction.response.defer(ephemeral=True, thinking=True)
     try:
-        event = service_calendars.events().insert(calendarId='bkshlhck01pl08tgfif8qj89no@group.calendar.google.com',
-                                                  body=event_body).execute()
-        await interaction.response.send_message(f'added event: {event}. this message is only visible to you and will '
-                                                f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
+        tenant = tenants.get(interaction.guild_id)
+        event = await tenant.run(lambda: tenant.calendar.events().insert(calendarId=tenant.config.calendar_id,
+                                                                         body=event_body).execute())
+        await send_followup(interaction, f'added event: {event}. this message is only visible to you and will '
+                                         f'terminate in T-minus 60 seconds')
     except Exception as e:  # do research - try to look for the exact error(s) in this situation
-        await interaction.response.send_message(f'an error occurred: {e}. this message is only visible to you and will '
-                                                f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
+        await send_followup(interaction, f'an error occurred: {e}. this message is only visible to you and will '
+                                         f'terminate in T-minus 60 seconds')
     # return NotImplementedError("no code here yet...")
 
 
@@ -930,14 +1015,16 @@ async def insertWholeDayEvent(interaction: discord.Interaction, title: str, loca
             'timeZone': 'America/Los_Angeles',
         },
     }
+    await interaction.response.defer(ephemeral=True, thinking=True)
     try:
-        event = service_calendars.events().insert(calendarId='bkshlhck01pl08tgfif8qj89no@group.calendar.google.com',
-                                                  body=event_body).execute()
-        await interaction.response.send_message(f'added event: {event}. this message is only visible to you and will '
-                                                f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
+        tenant = tenants.get(interaction.guild_id)
+        event = await tenant.run(lambda: tenant.calendar.events().insert(calendarId=tenant.config.calendar_id,
+                                                                         body=event_body).execute())
+        await send_followup(interaction, f'added event: {event}. this message is only visible to you and will '
+                                         f'terminate in T-minus 60 seconds')
     except Exception as e:  # do research - try to look for the exact error(s) in this situation
-        await interaction.response.send_message(f'an error occurred: {e}. this message is only visible to you and will '
-                                                f'terminate in T-minus 60 seconds', ephemeral=True, delete_after=60)
+        await send_followup(interaction, f'an error occurred: {e}. this message is only visible to you and will '
+                                         f'terminate in T-minus 60 seconds')
     # return NotImplementedError("no code here yet...")
 
 
@@ -0,0 +1,111 @@
+# capture side of the record-and-replay harness (replay.py is the other half)
+#
+# with RECORD_DIR set in .env the bot appends every slash-command interaction it receives & every Google API
+# request/response pair it makes to RECORD_DIR/session-<start time>.jsonl, 1 JSON object per line:
+#   {"type": "session", "started": ..., "config": {...}}          - 1st line, default chapter's spreadsheet/ranges
+#   {"type": "interaction", "t": ..., "command": ..., ...}        - t = seconds since the session started
+#   {"type": "http", "t": ..., "method": ..., "uri": ..., ...}
+#
+# credentials never end up in a recording: request headers (Authorization) aren't stored, key/token query parameters
+# are stripped from URIs & OAuth token requests/responses are skipped entirely
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import httplib2
+
+# query parameters that can carry credentials
+SECRET_PARAMS = {'key', 'access_token', 'oauth_token', 'token'}
+# hosts that hand out/check OAuth tokens - nothing sent to or received from them is recorded
+TOKEN_HOSTS = {'oauth2.googleapis.com', 'accounts.google.com'}
+# response headers worth keeping for replay
+KEPT_HEADERS = {'status', 'content-type'}
+
+
+def scrub_uri(uri: str) -> str:
+    parts = urlsplit(uri)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in SECRET_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def is_token_request(uri: str) -> bool:
+    parts = urlsplit(uri)
+    return parts.netloc in TOKEN_HOSTS or f'{parts.netloc}{parts.path}'.startswith('www.googleapis.com/oauth2')
+
+
+class Recorder:
+    def __init__(self, directory: str, config: dict):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"session-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl")
+        self.started = time.monotonic()
+        self._lock = threading.Lock()  # Google calls are recorded from worker threads
+        self.write({'type': 'session', 'started': datetime.now().isoformat(), 'config': config})
+
+    def offset(self) -> float:
+        return round(time.monotonic() - self.started, 4)
+
+    def write(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line + '\n')
+
+    def record_interaction(self, interaction, config: dict) -> None:
+        """
+        stores what a slash command handler needs to be re-run offline - never the interaction token
+        """
+        data = interaction.data or {}
+        guild = interaction.guild
+        self.write({
+            'type': 'interaction',
+            't': self.offset(),
+            'command': data.get('name'),
+            'options': {option['name']: option.get('value') for option in data.get('options', [])},
+            'guild_id': interaction.guild_id,
+            'channel_id': interaction.channel_id,
+            'user': {'id': interaction.user.id, 'name': interaction.user.name,
+                     'display_name': interaction.user.display_name},
+            # just enough of the server for commands that look up channels/roles by name
+            'guild': None if guild is None else {
+                'text_channels': [{'id': channel.id, 'name': channel.name} for channel in guild.text_channels],
+                'roles': [{'id': role.id, 'name': role.name} for role in guild.roles],
+            },
+            'config': config,  # the chapter config the command ran against
+        })
+
+
+class RecordingHttp(httplib2.Http):
+    """
+    httplib2.Http that records every request/response pair it handles - it sits under AuthorizedHttp, so requests
+    arrive with an Authorization header, which is why request headers are never written out
+    """
+
+    def __init__(self, recorder: Recorder, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        started = time.monotonic()
+        t = self.recorder.offset()
+        response, content = super().request(uri, method, body, headers, *args, **kwargs)
+
+        if not is_token_request(uri):
+            if isinstance(body, bytes):
+                body = body.decode('utf-8', errors='replace')
+            self.recorder.write({
+                'type': 'http',
+                't': t,
+                'elapsed': round(time.monotonic() - started, 4),
+                'method': method,
+                'uri': scrub_uri(uri),
+                'body': body,
+                'status': response.status,
+                'headers': {name: value for name, value in response.items() if name in KEPT_HEADERS},
+                'content': content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content,
+            })
+        return response, content
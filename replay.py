@@ -0,0 +1,300 @@
+# replay side of the record-and-replay harness (recorder.py is the capture side)
+#
+# re-runs every slash command in a recording against the bot's real command handlers, fully offline:
+#   - Discord is replaced by the Offline* stand-ins below (they just note down what the bot sends)
+#   - every Google API request is answered with the matching recorded response, after the recorded delay
+#   - interactions start at their recorded offsets, so overlapping commands overlap again
+#
+# usage: python replay.py RECORDING.jsonl [--speed 2] [--no-latency] [--profile replay.prof]
+
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import httplib2
+
+from recorder import scrub_uri
+
+# query parameters that depend on when a command ran (e.g. events_check asks for events after "now") - ignored when
+# matching requests to recordings
+VOLATILE_PARAMS = {'timeMin', 'timeMax', 'updatedMin'}
+
+# Discord gives a bot 3 seconds to respond to (or defer) an interaction before it fails on the user's end
+ACK_DEADLINE: float = 3.0
+
+
+def load_recording(path: str) -> tuple[dict, list[dict], list[dict]]:
+    """
+    returns (session entry, interaction entries, http entries) from a recording
+    """
+    session, interactions, http = {}, [], []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry['type'] == 'session':
+                session = entry
+            elif entry['type'] == 'interaction':
+                interactions.append(entry)
+            elif entry['type'] == 'http':
+                http.append(entry)
+    return session, interactions, http
+
+
+def match_uri(uri: str) -> str:
+    parts = urlsplit(scrub_uri(uri))
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name not in VOLATILE_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+class ReplayHttp:
+    """
+    stands in for httplib2.Http under the Google API client - answers each request with the next recorded response
+    for the same method, URI & body (or just method & URI if the body doesn't match anything), sleeping for the
+    recorded time first when latency is on. Once a request's recordings run out the last one keeps getting reused
+    """
+
+    def __init__(self, entries: list[dict], latency: bool = True, latency_scale: float = 1.0):
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._exact: dict[tuple, deque] = defaultdict(deque)
+        self._loose: dict[tuple, deque] = defaultdict(deque)
+        self._last: dict[tuple, dict] = {}
+        self._used: set[int] = set()  # id()'s of entries already served (each one sits in both lookups)
+        self._lock = threading.Lock()  # requests come in from several worker threads
+        for entry in entries:
+            uri = match_uri(entry['uri'])
+            self._exact[(entry['method'], uri, entry['body'])].append(entry)
+            self._loose[(entry['method'], uri)].append(entry)
+
+    def _next(self, method: str, uri: str, body) -> dict:
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', errors='replace')
+        exact_key, loose_key = (method, uri, body), (method, uri)
+        with self._lock:
+            for queue in (self._exact.get(exact_key), self._loose.get(loose_key)):
+                while queue and id(queue[0]) in self._used:
+                    queue.popleft()
+                if queue:
+                    entry = queue.popleft()
+                    self._used.add(id(entry))
+                    self._last[exact_key] = self._last[loose_key] = entry
+                    return entry
+            entry = self._last.get(exact_key) or self._last.get(loose_key)
+        if entry is None:
+            raise LookupError(f"no recorded response for {method} {uri}")
+        return entry
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        entry = self._next(method, match_uri(uri), body)
+        if self.latency:
+            time.sleep(entry['elapsed'] * self.latency_scale)  # runs in a worker thread, like the real request
+        response = httplib2.Response({**entry['headers'], 'status': str(entry['status'])})
+        return response, entry['content'].encode('utf-8')
+
+
+# stand-ins for the discord objects the command handlers touch
+class OfflineMessage:
+    def __init__(self, content: str = None):
+        self.content = content
+
+    async def delete(self, *, delay: float = None):
+        pass
+
+
+class OfflineUser:
+    def __init__(self, user_id: int, name: str, display_name: str):
+        self.id = user_id
+        self.name = name
+        self.display_name = display_name
+        self.bot = False
+        self.roles = []
+        self.sent: list[str] = []
+
+    async def send(self, content: str = None, **kwargs) -> OfflineMessage:
+        self.sent.append(content)
+        return OfflineMessage(content)
+
+
+class OfflineChannel:
+    def __init__(self, channel_id: int, name: str):
+        self.id = channel_id
+        self.name = name
+        self.sent: list[str] = []
+
+    async def send(self, content: str = None, **kwargs) -> OfflineMessage:
+        self.sent.append(content)
+        return OfflineMessage(content)
+
+
+class OfflineRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+
+
+class OfflineGuild:
+    def __init__(self, guild_id: int, text_channels: list[OfflineChannel] = (), roles: list[OfflineRole] = (),
+                 members: list[OfflineUser] = ()):
+        self.id = guild_id
+        self.text_channels = list(text_channels)
+        self.roles = list(roles)
+        self.members = list(members)
+
+
+class OfflineResponse:
+    def __init__(self, interaction: 'OfflineInteraction'):
+        self.interaction = interaction
+
+    def is_done(self) -> bool:
+        return self.interaction.acknowledged_at is not None
+
+    def _acknowledge(self):
+        if self.is_done():
+            # the real API refuses to respond twice - surface it the same way
+            raise RuntimeError("This interaction has already been responded to before")
+        self.interaction.acknowledged_at = time.perf_counter()
+
+    async def send_message(self, content: str = None, **kwargs):
+        self._acknowledge()
+        self.interaction.replies.append(content)
+
+    async def defer(self, **kwargs):
+        self._acknowledge()
+
+
+class OfflineFollowup:
+    def __init__(self, interaction: 'OfflineInteraction'):
+        self.interaction = interaction
+
+    async def send(self, content: str = None, **kwargs) -> OfflineMessage:
+        self.interaction.replies.append(content)
+        return OfflineMessage(content)
+
+
+class OfflineInteraction:
+    def __init__(self, user: OfflineUser, guild: OfflineGuild | None, channel_id: int = None, data: dict = None):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.channel_id = channel_id
+        self.data = data or {}
+        self.response = OfflineResponse(self)
+        self.followup = OfflineFollowup(self)
+        self.replies: list[str] = []
+        self.started_at: float | None = None
+        self.acknowledged_at: float | None = None
+        self.finished_at: float | None = None
+        self.error: Exception | None = None  # whatever the handler raised, if anything
+
+    def ack_latency(self) -> float | None:
+        if self.started_at is None or self.acknowledged_at is None:
+            return None
+        return self.acknowledged_at - self.started_at
+
+
+def interaction_from_entry(entry: dict) -> OfflineInteraction:
+    guild = None
+    if entry['guild_id'] is not None:
+        recorded = entry.get('guild') or {}
+        guild = OfflineGuild(entry['guild_id'],
+                             [OfflineChannel(channel['id'], channel['name'])
+                              for channel in recorded.get('text_channels', [])],
+                             [OfflineRole(role['id'], role['name']) for role in recorded.get('roles', [])])
+    user = OfflineUser(entry['user']['id'], entry['user']['name'], entry['user']['display_name'])
+    return OfflineInteraction(user, guild, entry['channel_id'], {'name': entry['command']})
+
+
+def offline_bot(http, session_config: dict = None):
+    """
+    imports main (i.e. the bot & every command handler) with Google answered by http instead of the real API
+    session_config ("SPREADSHEET_ID", "X_CHECK_RANGE", ...) becomes the default chapter's config
+    """
+    os.environ['GOOGLE_OFFLINE'] = '1'
+    os.environ['DEPLOY_MODE'] = 'single'  # never write replayed jobs into the real job queue
+    os.environ['TENANTS_DB'] = ':memory:'  # chapter configs come from the recording, not the real table
+    os.environ.pop('RECORD_DIR', None)
+    for name, value in (session_config or {}).items():
+        if value is not None:
+            os.environ[name] = value
+
+    import main
+    main.offline_http = http
+    return main
+
+
+async def run_interaction(main, entry: dict, delay: float) -> tuple[dict, OfflineInteraction, Exception | None]:
+    await asyncio.sleep(delay)
+    interaction = interaction_from_entry(entry)
+    command = main.bot.tree.get_command(entry['command'])
+    interaction.started_at = time.perf_counter()
+    error = None
+    try:
+        if command is None:
+            raise LookupError(f"no command named {entry['command']!r}")
+        await command.callback(interaction, **entry['options'])
+    except Exception as e:
+        error = e
+    interaction.finished_at = time.perf_counter()
+    return entry, interaction, error
+
+
+async def replay(path: str, speed: float = 1.0, latency: bool = True) -> list:
+    session, interactions, http_entries = load_recording(path)
+    main = offline_bot(ReplayHttp(http_entries, latency), session.get('config'))
+
+    from tenants import TenantConfig
+    for entry in interactions:
+        if entry['guild_id'] is not None and entry.get('config'):
+            main.tenants.register(entry['guild_id'], TenantConfig(**entry['config']))
+
+    return await asyncio.gather(*(run_interaction(main, entry, entry['t'] / speed) for entry in interactions))
+
+
+def print_report(results: list) -> None:
+    by_command = defaultdict(list)
+    for entry, interaction, error in results:
+        by_command[entry['command']].append((interaction, error))
+
+    print(f"{'command':<28}{'runs':>6}{'avg ack':>10}{'max ack':>10}{'late':>6}{'avg total':>11}{'errors':>8}")
+    for command, runs in sorted(by_command.items()):
+        acks = [interaction.ack_latency() for interaction, error in runs if interaction.ack_latency() is not None]
+        totals = [interaction.finished_at - interaction.started_at for interaction, error in runs]
+        late = sum(1 for interaction, error in runs
+                   if interaction.ack_latency() is None or interaction.ack_latency() > ACK_DEADLINE)
+        errors = sum(1 for interaction, error in runs if error is not None)
+        print(f"{command:<28}{len(runs):>6}"
+              f"{(sum(acks) / len(acks) if acks else float('nan')):>10.3f}{max(acks, default=float('nan')):>10.3f}"
+              f"{late:>6}{sum(totals) / len(totals):>11.3f}{errors:>8}")
+
+    for entry, interaction, error in results:
+        if error is not None:
+            print(f"  {entry['command']} at t={entry['t']}: {type(error).__name__}: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="replay a recorded session (see recorder.py) offline")
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=1.0, help="2 = interactions arrive twice as fast")
+    parser.add_argument('--no-latency', action='store_true', help="answer Google requests instantly")
+    parser.add_argument('--profile', metavar='FILE', help="write cProfile stats of the whole replay to FILE")
+    args = parser.parse_args()
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    replay_results = asyncio.run(replay(args.recording, args.speed, not args.no_latency))
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+    print_report(replay_results)
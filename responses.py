@@ -1,20 +1,120 @@
+import json
+import os
+import sys
+from collections import deque
 from random import choice, randint
 
+# auto-reply rules live in a json file so new replies don't need code changes - format:
+#   "empty": reply to an empty message, "fallback": list of replies when nothing matches,
+#   "rules": list of {"triggers": [...], "responses": [...]} - earlier rules win when several match
+# "{dice}" in a response gets replaced with a dice roll (1-6)
+RESPONSES_FILE = os.getenv('RESPONSES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                          'responses.json'))
+
+
+NO_MATCH: int = sys.maxsize  # "rule index" of trie nodes that don't end any trigger
+
+
+class TriggerAutomaton:
+    """
+    Aho-Corasick automaton over every trigger - the message is walked 1 character at a time with 1 dict lookup per
+    character, so matching costs the same no matter how many rules there are. Every trigger ending at a state is
+    already folded into best[state] (the lowest rule index among them), so a scan only has to keep the minimum
+    """
+    __slots__ = ('transitions', 'best')
+
+    def __init__(self, rule_for_trigger: dict[str, int]):
+        # build the trie - node 0 is the root
+        goto: list[dict[str, int]] = [{}]
+        best: list[int] = [NO_MATCH]
+        for trigger, index in rule_for_trigger.items():
+            node = 0
+            for character in trigger:
+                child = goto[node].get(character)
+                if child is None:
+                    child = goto[node][character] = len(goto)
+                    goto.append({})
+                    best.append(NO_MATCH)
+                node = child
+            best[node] = min(best[node], index)
+
+        # breadth-first, so a node's failure link (its longest proper suffix in the trie) is always finished first -
+        # each node gets the full transition table of its failure link with its own trie edges on top, turning the
+        # trie into a DFA: characters with no transition (e.g. ones no trigger uses) go back to the root
+        transitions: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        fail: list[int] = [0] * len(goto)
+        queue = deque(goto[0].values())  # the root's children fail back to the root
+        while queue:
+            node = queue.popleft()
+            best[node] = min(best[node], best[fail[node]])
+            transitions[node] = {**transitions[fail[node]], **goto[node]}
+            for character, child in goto[node].items():
+                fail[child] = transitions[fail[node]].get(character, 0)
+                queue.append(child)
+
+        self.transitions = transitions
+        self.best = best
+
+    def search(self, text: str) -> int | None:
+        transitions, best = self.transitions, self.best
+        node, found = 0, best[0]
+        for character in text:
+            node = transitions[node].get(character, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == 0:  # nothing can beat the 1st rule
+                    break
+        return None if found == NO_MATCH else found
+
+
+class ResponseEngine:
+    """
+    compiles every trigger into 1 Aho-Corasick automaton at startup so a message is matched against all rules in a
+    single pass over its characters, instead of 1 substring check per rule
+    """
+
+    def __init__(self, rules: list[dict], empty: str, fallback: list[str]):
+        self.empty = empty
+        self.fallback = fallback
+        self.responses: list[list[str]] = []
+        self.rule_for_trigger: dict[str, int] = {}  # lowercased trigger -> index of 1st rule that uses it
+
+        for index, rule in enumerate(rules):
+            self.responses.append(rule['responses'])
+            for trigger in rule['triggers']:
+                self.rule_for_trigger.setdefault(trigger.lower(), index)
+
+        self.automaton = TriggerAutomaton(self.rule_for_trigger) if self.rule_for_trigger else None
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ResponseEngine':
+        with open(path, encoding='utf-8') as file:
+            config = json.load(file)
+        return cls(config.get('rules', []), config.get('empty', ''), config.get('fallback', []))
+
+    def match(self, lowered: str) -> int | None:
+        """
+        returns the index of the highest-priority rule with a trigger somewhere in lowered, or None
+        """
+        if self.automaton is None:
+            return None
+        return self.automaton.search(lowered)
+
+    def get_response(self, user_input: str) -> str:
+        lowered: str = user_input.lower()
+
+        if lowered == '':
+            return self.empty
+
+        index = self.match(lowered)
+        if index is None:
+            return choice(self.fallback)
+        response = choice(self.responses[index])
+        return response.replace('{dice}', str(randint(1, 6))) if '{dice}' in response else response
+
+
+engine = ResponseEngine.from_file(RESPONSES_FILE)
+
+
 def get_response(user_input: str) -> str:
-    lowered: str = user_input.lower()
-
-    if lowered == '':
-        return 'well, you\'re awfully silent...'
-    elif 'hello' in lowered:
-        return 'hello there!'
-    elif 'how are you' in lowered:
-        return 'Good, thanks!'
-    elif 'bye' in lowered:
-        return 'see you!'
-    elif 'roll dice' in lowered:
-        return f'you rolled: {randint(1, 6)}'
-    else:
-        return choice(['I do not understand',
-                       'what are you talking about?',
-                       'what kinda language is that?',
-                       'would you mind repeating that?'])
+    return engine.get_response(user_input)
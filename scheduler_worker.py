@@ -0,0 +1,70 @@
+# scheduler worker for the "sharded" deployment mode (DEPLOY_MODE=sharded in .env)
+#
+# the bot process only writes scheduled jobs into the SQLite job queue (see jobs.py) - this process reads them back,
+# schedules them with its own AsyncIOScheduler & sends the messages/DMs itself. It logs in to Discord's REST API only
+# (no gateway connection), so it doesn't take up a shard & big weekly DM fan-outs can't slow down slash commands
+#
+# run it next to the bot: python scheduler_worker.py
+
+import asyncio
+import os
+import sqlite3
+
+import discord
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from jobs import build_trigger, is_expired, read_queue, last_reset_id
+from loop_watchdog import LoopWatchdog
+
+# importing main sets up the Google services & the job functions - it doesn't start the bot
+import main
+
+# how often (in seconds) to check the queue for newly scheduled/cancelled jobs
+POLL_INTERVAL: float = float(os.getenv('JOB_QUEUE_POLL_INTERVAL', '2'))
+
+
+async def run_worker() -> None:
+    intents = discord.Intents.none()
+    # guild.fetch_members() (used by dm & bad_status jobs - this client has no member cache) refuses to run unless the
+    # members intent is on, even over REST. The bot application needs the Server Members intent enabled anyway
+    intents.members = True
+    client = discord.Client(intents=intents)
+    await client.login(main.TOKEN)  # REST only - never calls connect()
+
+    scheduler = AsyncIOScheduler()
+    scheduler.start()
+    # big DM fan-outs run here - print the stack of anything that blocks this loop too
+    watchdog = LoopWatchdog()
+    watchdog.start()
+
+    # replay every job queued since the last "cancel all" so restarting the worker doesn't lose jobs
+    last_seen = max(last_reset_id() - 1, 0)
+    print(f'scheduler worker running as {client.user}')
+
+    try:
+        while True:
+            try:
+                queued = read_queue(last_seen)
+            except sqlite3.Error as e:
+                # e.g. "database is locked" while the bot writes a job - just try again next poll
+                print(f'could not read the job queue: {e}')
+                queued = []
+            for row_id, action, kind, trigger, job_args in queued:
+                last_seen = row_id
+                if action == 'remove_all':
+                    scheduler.remove_all_jobs()
+                    print('all scheduled jobs removed')
+                elif action == 'add' and not is_expired(trigger):
+                    scheduler.add_job(main.run_scheduled_job, build_trigger(trigger),
+                                      args=[kind, main.with_template(kind, job_args), client])
+                    print(f'scheduled {kind} job #{row_id}: {trigger}')
+            await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        await main.dm_digest.flush_all()  # don't drop DMs still waiting in a digest window
+        watchdog.stop()
+        scheduler.shutdown(wait=False)
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,383 @@
+# helper code for talking to Google Sheets - kept out of main.py so the bot file doesn't keep growing
+
+import asyncio
+import json
+import random
+import re
+
+from googleapiclient.errors import HttpError
+
+# Google recommends keeping batchUpdate bodies at ~2MB max - stay well under that so 1 chunk never gets rejected
+MAX_BATCH_BYTES: int = 1_000_000
+MAX_BATCH_REQUESTS: int = 500
+# "too many requests" + server-side errors are worth retrying, anything else (e.g. 400 bad request) won't fix itself
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# how many rows of a big range (e.g. the attendance grid) get pulled per values().get call
+BLOCK_ROWS: int = 200
+
+# "B2:Z60", "B2:Z", "B:Z", "B2", "2:60" - the part of an A1 range after the tab title (columns go up to "ZZZ")
+_A1_CELLS = re.compile(r"^([A-Za-z]{0,3})(\d*)(?::([A-Za-z]{0,3})(\d*))?$")
+
+
+class RangeError(ValueError):
+    """
+    a range from the config (X_CHECK_RANGE, NAME_RANGE, ...) that isn't a tab name or A1 notation - the message is
+    meant to be shown to the user as-is
+    """
+
+
+def _is_tab_title(a1_range: str) -> bool:
+    # like Google: without a "!", anything that isn't a cell reference ("B2", "B:Z", "A1:C5") names a whole tab
+    # (so "attendance" or "active_rolls" is a tab, not column "ATTENDANCE")
+    text = a1_range.strip()
+    if len(text) >= 2 and text[0] == "'" and text[-1] == "'":
+        return True
+    return not (_A1_CELLS.match(text) and any(character.isdigit() or character == ':' for character in text))
+
+
+def tab_title_from_range(a1_range: str | None) -> str | None:
+    """
+    pulls the tab (sub-sheet) title out of an A1-notation range
+        e.g. "active_rolls!A2:A60" -> "active_rolls", "'Spring 2025'!B1:Z1" -> "Spring 2025", "active_rolls" -> itself
+    returns None if the range doesn't name a tab (Google then defaults to the 1st tab anyway)
+    """
+    if not a1_range:
+        return None
+    if '!' in a1_range:
+        title = a1_range.rsplit('!', 1)[0]
+    elif _is_tab_title(a1_range):
+        title = a1_range.strip()
+    else:
+        return None
+    # tab titles with spaces/symbols get wrapped in single quotes, and a literal ' is escaped as ''
+    if len(title) >= 2 and title[0] == "'" and title[-1] == "'":
+        title = title[1:-1].replace("''", "'")
+    return title
+
+
+def split_a1_range(a1_range: str) -> tuple[str, str, int, str, int | None]:
+    """
+    breaks an A1 range into (tab prefix, start column, start row, end column, end row)
+        e.g. "active_rolls!C1:AZ80" -> ("active_rolls!", "C", 1, "AZ", 80)
+    a missing start row means row 1, a missing end row (e.g. "C1:AZ") means "until the data runs out" -> None
+    a bare tab name means the whole tab: "active_rolls" -> ("'active_rolls'!", "", 1, "", None) - empty columns
+    turn into row-only ranges like "'active_rolls'!2:201", which Google reads as every column
+    raises RangeError for anything else
+    """
+    if '!' not in a1_range and _is_tab_title(a1_range):
+        title = tab_title_from_range(a1_range)
+        return "'" + title.replace("'", "''") + "'!", '', 1, '', None
+
+    prefix, cells = '', a1_range
+    if '!' in a1_range:
+        prefix, cells = a1_range.rsplit('!', 1)
+        prefix += '!'
+    match = _A1_CELLS.match(cells.strip())
+    if not match:
+        raise RangeError(f"I can't read the range {a1_range!r} - it has to be a tab name (e.g. attendance) or A1 "
+                         f"notation (e.g. attendance!A1:Z60)")
+    start_col, start_row, end_col, end_row = match.groups()
+    if end_col is None and end_row is None:  # single cell e.g. "B2"
+        end_col, end_row = start_col, start_row
+    return (prefix, start_col, int(start_row) if start_row else 1,
+            end_col or start_col, int(end_row) if end_row else None)
+
+
+def iter_range_blocks(sheet, spreadsheet_id: str, a1_range: str, block_rows: int = BLOCK_ROWS,
+                      max_rows: int | None = None):
+    """
+    reads a (possibly huge) range block_rows rows at a time instead of in 1 giant values().get call
+    yields (offset, rows) - offset being the index of the block's 1st row within the whole range
+
+    reading stops at the end of the range, after max_rows rows, or - for ranges without an end row - at the 1st block
+    that comes back empty. Google drops trailing empty rows, so a block can hold fewer than block_rows rows
+    """
+    prefix, start_col, start_row, end_col, end_row = split_a1_range(a1_range)
+    last_row = end_row
+    if max_rows is not None:
+        last_row = start_row + max_rows - 1 if last_row is None else min(last_row, start_row + max_rows - 1)
+
+    row = start_row
+    while last_row is None or row <= last_row:
+        block_end = row + block_rows - 1 if last_row is None else min(row + block_rows - 1, last_row)
+        block_range = f"{prefix}{start_col}{row}:{end_col}{block_end}"
+        values = sheet.values().get(spreadsheetId=spreadsheet_id, range=block_range).execute().get('values', [])
+        if not values and last_row is None:
+            return
+        yield row - start_row, values
+        row = block_end + 1
+
+
+def read_event_titles(sheet, spreadsheet_id: str, x_range: str) -> list[str]:
+    """
+    fetches just the 1st row of the attendance range (the event titles) - [] if no event is created yet
+    """
+    prefix, start_col, start_row, end_col, end_row = split_a1_range(x_range)
+    header_range = f"{prefix}{start_col}{start_row}:{end_col}{start_row}"
+    values = sheet.values().get(spreadsheetId=spreadsheet_id, range=header_range).execute().get('values', [])
+    return values[0] if values else []
+
+
+def iter_attendance_blocks(sheet, spreadsheet_id: str, x_range: str, member_count: int,
+                           block_rows: int = BLOCK_ROWS):
+    """
+    streams the attendance grid (every row under the event titles) in blocks, turning each block into 2 columns of
+    bitmaps - bit i of missed[j] is set if member start+j has an "x" under event i, same for late[j] and "t"
+    yields (start, missed, late); every member index from 0 to member_count-1 shows up exactly once (members without
+    any marks - whose rows Google leaves out - get 0 bitmaps)
+    """
+    prefix, start_col, start_row, end_col, end_row = split_a1_range(x_range)
+    members_range = f"{prefix}{start_col}{start_row + 1}:{end_col}{'' if end_row is None else end_row}"
+    # a range that's only the title row has no attendance to read - every member still gets padded out below
+    blocks = () if end_row is not None and end_row <= start_row else \
+        iter_range_blocks(sheet, spreadsheet_id, members_range, block_rows, member_count)
+
+    done = 0
+    for offset, rows in blocks:
+        missed: list[int] = []
+        late: list[int] = []
+        for row in rows:
+            missed_bits = late_bits = 0
+            for i, mark in enumerate(row):
+                if mark == "x":
+                    missed_bits |= 1 << i
+                elif mark == "t":
+                    late_bits |= 1 << i
+            missed.append(missed_bits)
+            late.append(late_bits)
+        # pad out rows Google trimmed off the end of the block
+        block_size = min(block_rows, member_count - offset)
+        missed.extend([0] * (block_size - len(missed)))
+        late.extend([0] * (block_size - len(late)))
+        yield offset, missed, late
+        done = offset + block_size
+
+    if done < member_count:  # attendance range ends before the roster does
+        yield done, [0] * (member_count - done), [0] * (member_count - done)
+
+
+class SheetMetadataCache:
+    """
+    caches the sheetId of every tab in a spreadsheet, looked up by the tab's title
+
+    fetching the whole spreadsheet resource with sheet.get() pulls properties for every tab (plus a bunch of stuff we
+    never use), so this only asks for sheets.properties and keeps the result around until the tab structure changes:
+        - looking up a title that isn't cached (tab added/renamed) triggers 1 refresh
+        - callers should call invalidate() when Google rejects a sheetId (tab deleted/re-created)
+    """
+
+    FIELDS = 'sheets.properties(sheetId,title,index)'
+
+    def __init__(self, sheet, spreadsheet_id: str):
+        self.sheet = sheet  # the service_sheets.spreadsheets() instance
+        self.spreadsheet_id = spreadsheet_id
+        self._tabs: dict[str, int] | None = None  # tab title -> sheetId
+        self._first_title: str | None = None  # title of the left-most tab
+
+    def refresh(self) -> None:
+        spreadsheet = self.sheet.get(spreadsheetId=self.spreadsheet_id, fields=self.FIELDS).execute()
+        properties = sorted((tab['properties'] for tab in spreadsheet.get('sheets', [])),
+                            key=lambda prop: prop.get('index', 0))
+
+        self._tabs = {prop['title']: prop['sheetId'] for prop in properties}
+        self._first_title = properties[0]['title'] if properties else None
+
+    def invalidate(self) -> None:
+        self._tabs = None
+        self._first_title = None
+
+    def get_sheet_id(self, title: str | None = None) -> int:
+        """
+        returns the sheetId of the tab named title - or of the 1st tab if title is None
+        raises ValueError if no such tab exists even after re-fetching the metadata
+        """
+        refreshed = False
+        if self._tabs is None:
+            self.refresh()
+            refreshed = True
+
+        if title is None:
+            if self._first_title is None:  # if somehow there's no sheet created in spreadsheet
+                raise ValueError("no sheet created")
+            return self._tabs[self._first_title]
+
+        if title not in self._tabs and not refreshed:
+            # tab might've been added or renamed since we last looked - check once more before giving up
+            self.refresh()
+
+        if title not in self._tabs:
+            raise ValueError(f"no sheet named {title!r} in spreadsheet")
+        return self._tabs[title]
+
+
+def merge_cell_updates(requests: list[dict]) -> list[dict]:
+    """
+    merges back-to-back updateCells requests that write the same columns & fields of vertically adjacent rows into
+    1 request covering the whole range - e.g. 40 single-cell note updates in column B become 1 request for B2:B41
+    anything that isn't a mergeable updateCells request is passed through untouched (and in the same order)
+    """
+    merged: list[dict] = []
+    for request in requests:
+        update = request.get('updateCells')
+        previous = merged[-1].get('updateCells') if merged else None
+
+        if update and previous and 'range' in update and 'range' in previous \
+                and update.get('fields') == previous.get('fields'):
+            prev_range, cur_range = previous['range'], update['range']
+            if prev_range.get('sheetId') == cur_range.get('sheetId') \
+                    and prev_range.get('startColumnIndex') == cur_range.get('startColumnIndex') \
+                    and prev_range.get('endColumnIndex') == cur_range.get('endColumnIndex') \
+                    and prev_range.get('endRowIndex') == cur_range.get('startRowIndex') \
+                    and len(update.get('rows', [])) == cur_range['endRowIndex'] - cur_range['startRowIndex']:
+                previous['rows'].extend(update['rows'])
+                prev_range['endRowIndex'] = cur_range['endRowIndex']
+                continue
+
+        if update and 'range' in update:
+            # copy so merging never edits the caller's request dicts
+            request = {'updateCells': {**update, 'range': dict(update['range']), 'rows': list(update.get('rows', []))}}
+        merged.append(request)
+    return merged
+
+
+def note_column_request(sheet_id: int, column_index: int, start_row_index: int, notes: list[str]) -> dict:
+    """
+    builds 1 updateCells request that writes notes[0], notes[1]... into consecutive cells of a single column, starting
+    at start_row_index (0-based) - instead of 1 request (with its own range) per cell
+    an empty string clears that cell's note
+    """
+    return {
+        'updateCells': {
+            'range': {
+                'sheetId': sheet_id,
+                'startRowIndex': start_row_index,
+                'endRowIndex': start_row_index + len(notes),
+                'startColumnIndex': column_index,
+                'endColumnIndex': column_index + 1
+            },
+            'rows': [{'values': [{'note': note}]} for note in notes],
+            'fields': 'note'
+        }
+    }
+
+
+def split_grid_request(request: dict, max_bytes: int = MAX_BATCH_BYTES) -> list[dict]:
+    """
+    splits an updateCells request whose JSON is bigger than max_bytes into several requests over consecutive row
+    spans (each under max_bytes where possible) - anything else, or a request that already fits, comes back as is
+    """
+    update = request.get('updateCells')
+    if not update or 'range' not in update or len(json.dumps(request, separators=(',', ':'))) <= max_bytes:
+        return [request]
+
+    pieces: list[dict] = []
+    rows: list[dict] = []
+    # whatever's left of max_bytes after the range/fields part of the request is what the rows get
+    size = len(json.dumps({'updateCells': {**update, 'rows': []}}, separators=(',', ':')))
+    overhead = size
+    start = update['range']['startRowIndex']
+    for row in update['rows']:
+        row_size = len(json.dumps(row, separators=(',', ':'))) + 1
+        if rows and size + row_size > max_bytes:
+            pieces.append({'updateCells': {**update, 'rows': rows,
+                                           'range': {**update['range'], 'startRowIndex': start,
+                                                     'endRowIndex': start + len(rows)}}})
+            start += len(rows)
+            rows, size = [], overhead
+        rows.append(row)
+        size += row_size
+    pieces.append({'updateCells': {**update, 'rows': rows,
+                                   'range': {**update['range'], 'startRowIndex': start,
+                                             'endRowIndex': start + len(rows)}}})
+    return pieces
+
+
+def chunk_requests(requests: list[dict], max_bytes: int = MAX_BATCH_BYTES,
+                   max_requests: int = MAX_BATCH_REQUESTS) -> list[list[dict]]:
+    """
+    splits requests into consecutive chunks that each stay under max_bytes (size of the JSON body) and max_requests
+    oversized updateCells requests are split by rows first - any other request that's bigger than max_bytes on its
+    own still gets sent, in a chunk by itself
+    """
+    chunks: list[list[dict]] = []
+    current: list[dict] = []
+    current_size = 0
+
+    for request in (piece for request in requests for piece in split_grid_request(request, max_bytes)):
+        size = len(json.dumps(request, separators=(',', ':')))
+        if current and (current_size + size > max_bytes or len(current) >= max_requests):
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append(request)
+        current_size += size
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def request_rows(request: dict) -> list[int]:
+    """
+    returns the (1-based, like in the Sheets UI) row numbers a grid request writes to, or [] if it doesn't say
+    """
+    grid_range = next(iter(request.values()), {}).get('range', {})
+    if 'startRowIndex' not in grid_range or 'endRowIndex' not in grid_range:
+        return []
+    return list(range(grid_range['startRowIndex'] + 1, grid_range['endRowIndex'] + 1))
+
+
+async def execute_with_backoff(make_request, max_retries: int = 5, base_delay: float = 1.0):
+    """
+    builds & executes a googleapiclient request (make_request() returns it) in a worker thread, retrying 429/5xx
+    errors with exponential backoff (1s, 2s, 4s... + jitter)
+    other errors - or running out of retries - re-raise the HttpError
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            # the request is built in the same thread that sends it - service objects aren't thread-safe
+            return await asyncio.to_thread(lambda: make_request().execute())
+        except HttpError as e:
+            if e.resp.status not in RETRY_STATUSES or attempt == max_retries:
+                raise
+            delay = base_delay * 2 ** attempt + random.uniform(0, base_delay)
+            print(f"Sheets returned {e.resp.status}, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+
+async def write_batch_update(sheet, spreadsheet_id: str, requests: list[dict],
+                             max_bytes: int = MAX_BATCH_BYTES,
+                             max_requests: int = MAX_BATCH_REQUESTS) -> list[tuple[list[int], Exception]]:
+    """
+    sends requests through spreadsheets.batchUpdate:
+        1. adjacent cell updates are merged into range updates
+        2. the result is split into bounded chunks (big range updates get split by rows)
+        3. every chunk runs (with retries) even if an earlier one failed
+
+    Google applies each batchUpdate call atomically, so a chunk either fully lands or fully doesn't
+    returns a list of (rows, error) for every chunk that failed - an empty list means everything was written
+    """
+    failures: list[tuple[list[int], Exception]] = []
+    # no requests -> nothing to send (Google answers an empty body with HttpError 400 anyway)
+    for chunk in chunk_requests(merge_cell_updates(requests), max_bytes, max_requests):
+        try:
+            await execute_with_backoff(
+                lambda: sheet.batchUpdate(spreadsheetId=spreadsheet_id, body={'requests': chunk}))
+        except Exception as e:
+            rows = [row for request in chunk for row in request_rows(request)]
+            print(f"batchUpdate failed for rows {rows}: {e}")
+            failures.append((rows, e))
+    return failures
+
+
+def format_row_ranges(rows: list[int]) -> str:
+    """
+    squashes row numbers into a short readable string - [2, 3, 4, 7, 9, 10] -> "2-4, 7, 9-10"
+    """
+    spans: list[str] = []
+    for row in sorted(set(rows)):
+        if spans and row == last + 1:
+            spans[-1] = f"{spans[-1].split('-')[0]}-{row}"
+        else:
+            spans.append(str(row))
+        last = row
+    return ", ".join(spans)
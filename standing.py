@@ -0,0 +1,114 @@
+# bad-standing "reasons" logic shared by the note, prepare_table, bad_standing_check & weekly DM commands
+
+import sys
+from dataclasses import dataclass
+
+from sheets import read_event_titles, iter_attendance_blocks
+
+
+class EventTable:
+    """
+    the event titles (1st row of X_CHECK_RANGE), interned & stored once - every MemberStanding points at the same
+    table instead of carrying its own copies of the titles
+    """
+    __slots__ = ('titles',)
+
+    def __init__(self, titles: list[str]):
+        self.titles: tuple[str, ...] = tuple(sys.intern(title) for title in titles)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+
+@dataclass(slots=True)
+class MemberStanding:
+    """
+    1 Brother's bad-standing data, straight from the sheet - the reason text is only built when reason() is called
+    (i.e. when a note or DM actually needs it)
+    """
+    name: str
+    points: str  # as written in SCORES_RANGE
+    missed: int  # bit i set = "x" under event i
+    late: int  # bit i set = "t" under event i
+    # OTHER_HOURS_RANGE columns, as written in the sheet
+    tutoring_hours: str
+    committee_hours: str
+    study_hours: str
+    missed_tabling_hours: str
+    extra_tabling_hours: str
+    events: EventTable
+
+    def in_bad_standing(self) -> bool:
+        return float(self.points) >= 2
+
+    def reason(self) -> str:
+        return attendance_reason(self.events.titles, self.missed, self.late) + hours_reason(
+            [self.tutoring_hours, self.committee_hours, self.study_hours, self.missed_tabling_hours,
+             self.extra_tabling_hours])
+
+
+def attendance_reason(event_titles: list[str], missed: int, late: int) -> str:
+    """
+    turns a member's attendance bitmaps (bit i set = "x"/"t" under event i) into reason lines, in event order
+    """
+    reason: str = ""
+    marks = missed | late
+    while marks:
+        i = (marks & -marks).bit_length() - 1  # index of the lowest set bit, i.e. the next marked event
+        marks &= marks - 1
+        title = event_titles[i] if i < len(event_titles) else f"event #{i + 1}"
+        if missed >> i & 1:
+            reason += "-missed " + title + " (+1)\n"
+        else:
+            reason += "-late to " + title + " (+0.5)\n"
+    return reason
+
+
+def hours_reason(hours: list[str]) -> str:
+    """
+    reason lines for a member's row of OTHER_HOURS_RANGE
+    (columns: tutoring, committee volunteering, study, missed tabling, extra tabling hours)
+    """
+    reason: str = ""
+    # checking for tabling, study, committee volunteering, tutoring hours
+    if float(hours[4]) > 0:  # tabling hours
+        reason += f'-Extra tabling hours: {hours[4]} (-{int(hours[4])})\n'
+    if float(hours[3]) > 0:  # tabling hours
+        reason += f'-missed tabling hours: {hours[3]} (+{int(hours[3])/4})\n'
+    if float(hours[2]) > 0:  # study hours
+        reason += f'-study hours attended: {hours[2]} (-{int(hours[2])/4})\n'
+    if float(hours[1]) > 0:  # committee volunteering hours
+        reason += f'-committee volunteering hours done: {hours[1]} (-{hours[1]})\n'
+    if float(hours[0]) > 0:  # tutored hours
+        reason += f'-tutoring hours done: {hours[0]} (-{hours[0]})\n'
+    return reason
+
+
+def load_standings(sheet, spreadsheet_id: str, x_range: str, name_range: str, scores_range: str,
+                   other_hours_range: str) -> tuple[EventTable, list[MemberStanding]]:
+    """
+    builds a MemberStanding for every Brother in the roster (in sheet order)
+    names, scores & hours come back in 1 batchGet call, the attendance grid gets streamed in blocks
+    returns an empty EventTable (and no members) if no event is created yet
+    """
+    events = EventTable(read_event_titles(sheet, spreadsheet_id, x_range))
+    if not events:
+        return events, []
+
+    value_ranges = sheet.values().batchGet(spreadsheetId=spreadsheet_id,
+                                           ranges=[name_range, scores_range, other_hours_range]).execute()
+    names, scores, other_hours = (value_range.get('values', []) for value_range in value_ranges.get('valueRanges', []))
+
+    members: list[MemberStanding] = []
+    for start, missed, late in iter_attendance_blocks(sheet, spreadsheet_id, x_range, len(other_hours)):
+        for j in range(len(missed)):
+            k = start + j
+            hours = other_hours[k]
+            members.append(MemberStanding(
+                name=names[k][0] if k < len(names) and names[k] else "",
+                points=scores[k][0] if k < len(scores) and scores[k] else "0",
+                missed=missed[j], late=late[j],
+                tutoring_hours=hours[0], committee_hours=hours[1], study_hours=hours[2],
+                missed_tabling_hours=hours[3], extra_tabling_hours=hours[4],
+                events=events))
+    return events, members
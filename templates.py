@@ -0,0 +1,44 @@
+# message templates for scheduled messages/DMs & the bad-standing reports
+#
+# a template is compiled once - when its job is scheduled (or at import for the built-in reports) - into a plain
+# str.format string: "[br]" (my own syntax for line breaks) becomes "\n", the known placeholders ({name}, {points},
+# {reasons}, ...) stay as fields & every other brace is escaped so it prints as typed. Rendering it for 1 recipient is
+# then a single format_map call - messages without any placeholders aren't formatted at all
+#   e.g. compile_template("hey {name}![br]meeting at 7", DM_FIELDS).render(name="Loc") -> "hey Loc!\nmeeting at 7"
+
+import re
+from functools import lru_cache
+
+LINE_BREAK = "[br]"
+
+# placeholders scheduled DMs can use - filled in per member
+DM_FIELDS = ('name',)
+# placeholders the bad-standing reports use
+STANDING_FIELDS = ('name', 'points', 'negation', 'reasons')
+
+
+class MessageTemplate:
+    __slots__ = ('source', 'fields', 'text', '_format')
+
+    def __init__(self, source: str, fields: tuple[str, ...] = ()):
+        self.source = source
+        text = source.replace(LINE_BREAK, "\n")
+        self.fields: tuple[str, ...] = tuple(field for field in fields if "{" + field + "}" in text)
+        self.text: str = text  # the finished message when there are no placeholders
+        self._format = None
+        if self.fields:
+            # escape every brace except the placeholders' own, so "{x}" or a lone "{" still prints as typed
+            placeholder = re.compile(r"\{(" + "|".join(map(re.escape, self.fields)) + r")\}|[{}]")
+            formatted = placeholder.sub(lambda match: match.group(0) if match.group(1) else match.group(0) * 2, text)
+            self._format = formatted.format_map
+
+    def render(self, **values) -> str:
+        if self._format is None:
+            return self.text
+        return self._format(values)
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str, fields: tuple[str, ...] = ()) -> MessageTemplate:
+    # the same message scheduled several times (or replayed from the job queue) shares 1 compiled template
+    return MessageTemplate(source, fields)
@@ -0,0 +1,222 @@
+# per-chapter (per-guild) configuration - lets 1 bot process serve several chapters' Discord servers, each with its
+# own spreadsheet, ranges & calendar
+#
+# configs live in a SQLite table & are only loaded the 1st time a guild uses a command. Guilds without a config
+# fall back to the default chapter set up in .env (SPREADSHEET_ID, X_CHECK_RANGE, etc.), so a single-chapter setup
+# works without ever touching the table
+#
+# each process keeps its own cache of configs, so every cached entry (including "no config, use the default") gets
+# checked against the table again after TENANT_CACHE_TTL seconds - that's how the scheduler worker notices a
+# set_chapter_config the bot process saved
+
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+from urllib.parse import quote
+
+from sheets import SheetMetadataCache, tab_title_from_range
+
+TENANTS_DB = os.getenv('TENANTS_DB', '/mnt/mydatavolume/sqlite_data/tenants.db')
+DEFAULT_CALENDAR_ID = os.getenv('CALENDAR_ID', 'bkshlhck01pl08tgfif8qj89no@group.calendar.google.com')
+# how many Google API operations 1 chapter can have running at the same time - also the most a chapter's own config
+# may ask for (it can only go lower)
+MAX_CONCURRENT_CALLS: int = int(os.getenv('TENANT_MAX_CONCURRENT_CALLS', '2'))
+# seconds a guild's config stays cached before it's re-read from the table
+CACHE_TTL: float = float(os.getenv('TENANT_CACHE_TTL', '30'))
+
+
+def parse_allowed_spreadsheets(value: str | None) -> dict[int, set[str]] | None:
+    # "guild id=spreadsheet id" pairs, comma-separated: "1234=abc,1234=def,5678=xyz" -> {1234: {abc, def}, 5678: {xyz}}
+    if not value:
+        return None
+    allowed: dict[int, set[str]] = {}
+    for pair in value.split(','):
+        guild_id, spreadsheet_id = pair.split('=', 1)
+        allowed.setdefault(int(guild_id), set()).add(spreadsheet_id.strip())
+    return allowed
+
+
+# optional - which spreadsheet(s) each guild may register with set_chapter_config (unset = any sheet no other chapter
+# uses yet). Every chapter's sheet is shared with the same service account, so this is what keeps 1 server's admin
+# from pointing their server at a sheet that isn't theirs
+ALLOWED_SPREADSHEETS = parse_allowed_spreadsheets(os.getenv('TENANT_ALLOWED_SPREADSHEETS'))
+
+
+class ThreadLocalResource:
+    """
+    googleapiclient service objects aren't thread-safe (they share 1 httplib2 connection), so this builds a separate
+    resource per thread with factory() & forwards attribute access to the current thread's copy
+        e.g. ThreadLocalResource(lambda: build('sheets', 'v4', credentials=creds).spreadsheets()).values()
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+
+    def __getattr__(self, name: str):
+        resource = getattr(self._local, 'resource', None)
+        if resource is None:
+            resource = self._local.resource = self._factory()
+        return getattr(resource, name)
+
+
+@dataclass(slots=True)
+class TenantConfig:
+    spreadsheet_id: str
+    calendar_id: str
+    x_check_range: str
+    name_range: str
+    scores_range: str
+    other_hours_range: str
+    note_sheet_title: str | None = None  # None -> the tab name_range points at (or the 1st tab)
+    max_concurrent_calls: int = MAX_CONCURRENT_CALLS
+
+    @classmethod
+    def from_env(cls) -> 'TenantConfig':
+        return cls(spreadsheet_id=os.getenv('SPREADSHEET_ID'),
+                   calendar_id=DEFAULT_CALENDAR_ID,
+                   x_check_range=os.getenv('X_CHECK_RANGE'),
+                   name_range=os.getenv('NAME_RANGE'),
+                   scores_range=os.getenv('SCORES_RANGE'),
+                   other_hours_range=os.getenv('OTHER_HOURS_RANGE'),
+                   note_sheet_title=os.getenv('NOTE_SHEET_TITLE'))
+
+
+class Tenant:
+    """
+    1 chapter's config plus everything that must not be shared between chapters: the spreadsheet metadata cache and
+    the API concurrency budget (so 1 chapter's huge sheet can't hog every Google call the bot makes)
+    """
+
+    def __init__(self, config: TenantConfig, sheet, calendar):
+        self.config = config
+        self.sheet = sheet
+        self.calendar = calendar
+        self.sheet_metadata = SheetMetadataCache(sheet, config.spreadsheet_id)
+        self.note_sheet_title = config.note_sheet_title or tab_title_from_range(config.name_range)
+        # capped server-side - every chapter's calls share asyncio's default thread pool, so 1 chapter asking for a huge
+        # budget could otherwise take up every worker thread & starve the rest
+        self.budget = asyncio.Semaphore(max(1, min(config.max_concurrent_calls, MAX_CONCURRENT_CALLS)))
+
+    async def run(self, function, *args):
+        """
+        runs a blocking Google API function in a worker thread, waiting for a free slot in this chapter's budget first
+        """
+        async with self.budget:
+            return await asyncio.to_thread(function, *args)
+
+
+class TenantRegistry:
+    def __init__(self, sheet, calendar, default_config: TenantConfig, path: str = TENANTS_DB,
+                 ttl: float = CACHE_TTL, allowed_spreadsheets: dict[int, set[str]] | None = ALLOWED_SPREADSHEETS):
+        self.sheet = sheet
+        self.calendar = calendar
+        self.path = path
+        self.ttl = ttl
+        self.allowed_spreadsheets = allowed_spreadsheets
+        self.default = Tenant(default_config, sheet, calendar)
+        # guild id -> (Tenant, time.monotonic() after which the table gets checked again), filled in lazily
+        self._tenants: dict[int, tuple[Tenant, float]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE IF NOT EXISTS tenants ('
+                           '    guild_id INTEGER PRIMARY KEY,'
+                           '    spreadsheet_id TEXT NOT NULL,'
+                           '    calendar_id TEXT NOT NULL,'
+                           '    x_check_range TEXT NOT NULL,'
+                           '    name_range TEXT NOT NULL,'
+                           '    scores_range TEXT NOT NULL,'
+                           '    other_hours_range TEXT NOT NULL,'
+                           '    note_sheet_title TEXT,'
+                           '    max_concurrent_calls INTEGER NOT NULL)')
+        return connection
+
+    def _load(self, guild_id: int) -> tuple | None:
+        """
+        the guild's row, or None if it has no config - a missing DB file/table (e.g. no chapter ever ran
+        set_chapter_config) just means "no config", only save() creates them
+        raises sqlite3.Error if the table exists but can't be read right now (e.g. it's locked)
+        """
+        if not os.path.exists(self.path):
+            return None
+        columns = [field.name for field in fields(TenantConfig)]
+        try:
+            connection = sqlite3.connect(f'file:{quote(self.path)}?mode=ro', uri=True)
+        except sqlite3.Error:  # e.g. no permission to open it
+            return None
+        try:
+            return connection.execute(f'SELECT {", ".join(columns)} FROM tenants WHERE guild_id = ?',
+                                      (guild_id,)).fetchone()
+        except sqlite3.OperationalError as e:
+            if 'no such table' in str(e):
+                return None
+            raise
+        finally:
+            connection.close()
+
+    def get(self, guild_id: int | None) -> Tenant:
+        if guild_id is None:  # e.g. a command used in DMs
+            return self.default
+        cached, expires = self._tenants.get(guild_id, (None, 0.0))
+        now = time.monotonic()
+        if cached is not None and now < expires:
+            return cached
+
+        try:
+            row = self._load(guild_id)
+        except sqlite3.Error as e:
+            if cached is None:
+                raise  # don't guess - the default chapter's data might not be this guild's
+            print(f'could not re-check chapter config for {guild_id}, using the cached one: {e}')
+            return cached  # not re-cached, so the next get() tries again
+
+        config = TenantConfig(*row) if row else None
+        if config is None:
+            # guilds without their own config share the default tenant (and its caches/budget)
+            tenant = self.default
+        elif cached is not None and cached is not self.default and cached.config == config:
+            tenant = cached  # unchanged - keep its metadata cache & budget
+        else:
+            tenant = Tenant(config, self.sheet, self.calendar)
+        self._tenants[guild_id] = (tenant, now + self.ttl)
+        return tenant
+
+    def register(self, guild_id: int, config: TenantConfig) -> None:
+        """
+        uses config for guild_id in this process only (nothing is saved) - e.g. for replaying recorded sessions
+        """
+        self._tenants[guild_id] = (Tenant(config, self.sheet, self.calendar), math.inf)
+
+    def save(self, guild_id: int, config: TenantConfig) -> None:
+        """
+        raises ValueError (with a message for the user) if guild_id may not use config's spreadsheet or calendar:
+        it's not on the guild's allow-list, or the default chapter or another guild already uses it
+        """
+        if self.allowed_spreadsheets is not None and \
+                config.spreadsheet_id not in self.allowed_spreadsheets.get(guild_id, ()):
+            raise ValueError("this server isn't allowed to use that spreadsheet - ask the bot's owner to add it to "
+                             "TENANT_ALLOWED_SPREADSHEETS")
+        if config.spreadsheet_id == self.default.config.spreadsheet_id or \
+                config.calendar_id == self.default.config.calendar_id:
+            raise ValueError("that spreadsheet or calendar belongs to the default chapter")
+
+        columns = [field.name for field in fields(TenantConfig)]
+        connection = self._connect()
+        try:
+            with connection:
+                owner = connection.execute('SELECT guild_id FROM tenants WHERE guild_id != ? AND '
+                                           '(spreadsheet_id = ? OR calendar_id = ?)',
+                                           (guild_id, config.spreadsheet_id, config.calendar_id)).fetchone()
+                if owner is not None:
+                    raise ValueError("that spreadsheet or calendar is already used by another server")
+                connection.execute(f'INSERT OR REPLACE INTO tenants (guild_id, {", ".join(columns)}) '
+                                   f'VALUES (?, {", ".join("?" for _ in columns)})',
+                                   (guild_id, *(getattr(config, column) for column in columns)))
+        finally:
+            connection.close()
+        self._tenants.pop(guild_id, None)  # next get() picks up the new config (with fresh caches)